@@ -0,0 +1,42 @@
+// Decoder for the packed calendar_data format written by
+// query_scripts/calendar_codec.py: a start date plus zlib-compressed,
+// base64-encoded little-endian uint32 daily counts.
+const PACKED_FORMAT = 'packed-v1';
+
+const isPacked = (calendar) =>
+  calendar && !Array.isArray(calendar) && calendar.format === PACKED_FORMAT;
+
+const inflate = async (bytes) => {
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Response(stream).arrayBuffer();
+};
+
+export const decodeCalendar = async (calendar) => {
+  if (!isPacked(calendar)) return calendar;
+
+  const bytes = Uint8Array.from(atob(calendar.counts), (c) => c.charCodeAt(0));
+  const view = new DataView(await inflate(bytes));
+  const start = new Date(`${calendar.start}T00:00:00Z`);
+
+  const weeks = [];
+  for (let i = 0; i < calendar.days; i++) {
+    const day = new Date(start.getTime() + i * 86400000);
+    // Weeks run Sunday..Saturday like GitHub's calendar
+    if (weeks.length === 0 || day.getUTCDay() === 0) {
+      weeks.push({ contributionDays: [] });
+    }
+    weeks[weeks.length - 1].contributionDays.push({
+      contributionCount: view.getUint32(i * 4, true),
+      date: day.toISOString().slice(0, 10),
+    });
+  }
+  return weeks;
+};
+
+export const decodeGithubUsers = (users) =>
+  Promise.all(
+    users.map(async (user) => ({
+      ...user,
+      calendar_data: await decodeCalendar(user.calendar_data),
+    }))
+  );
@@ -5,6 +5,7 @@ import ArrowUpwardIcon from '@mui/icons-material/ArrowUpward';
 import ArrowDownwardIcon from '@mui/icons-material/ArrowDownward';
 import RemoveIcon from '@mui/icons-material/Remove';
 import GitHubContributionsGraph from './GitHubContributionsGraph';
+import { decodeGithubUsers } from '../calendarCodec';
 
 const CustomCard = styled(Box)(({ theme }) => ({
   marginBottom: theme.spacing(2),
@@ -46,7 +47,7 @@ function GitHubContributions() {
         let data = [];
         if (result.value && result.value !== 'null') {
           try {
-            data = JSON.parse(result.value);
+            data = await decodeGithubUsers(JSON.parse(result.value));
           } catch (e) {
             console.error("Failed to parse github data:", e);
             data = [];
@@ -1,4 +1,5 @@
-import json
+from json_stream import iter_users, write_users
+from schema_migrations import SCHEMA_VERSION_FIELD, current_version, upgrade_records
 
 
 def read_usernames_from_file(filename):
@@ -7,34 +8,49 @@ def read_usernames_from_file(filename):
 
 
 def load_existing_users(filename):
-    with open(filename, "r") as file:
-        return json.load(file)
+    """Users of a .json array or .ndjson file, streamed one at a time and upgraded to the current schema"""
+    return upgrade_records("leetcode", iter_users(filename))
 
 
 def update_json(filename, users):
-    with open(filename, "w") as file:
-        json.dump(users, file, indent=4)
+    """Write users (any iterable) as a .json array or .ndjson file"""
+    write_users(filename, users)
+
+
+def new_user(username):
+    return {
+        "name": username,
+        "elo": 0,
+        "prev_elo": 0,
+        "prev_problem_count": 0,
+        "current_problem_delta": 0,
+        "problems_each_week": [],
+        "current_problem_count": 0,
+        SCHEMA_VERSION_FIELD: current_version("leetcode"),
+    }
 
 
 def add_users_to_json(usernames_file, json_file):
     new_usernames = read_usernames_from_file(usernames_file)
-    existing_users = load_existing_users(json_file)
-    for username in new_usernames:
-        new_user = {
-            "name": username,
-            "elo": 0,
-            "prev_elo": 0,
-            "prev_problem_count": 0,
-            "current_problem_delta": 0,
-            "problems_each_week": [],
-            "current_problem_count": 0,
-        }
-        existing_users.append(new_user)
-    update_json(json_file, existing_users)
+
+    def all_users():
+        # Streams the existing users through, only their names are kept in memory
+        existing = set()
+        for user in load_existing_users(json_file):
+            existing.add(user["name"])
+            yield user
+        for username in new_usernames:
+            if username and username not in existing:
+                existing.add(username)
+                yield new_user(username)
+
+    update_json(json_file, all_users())
 
 
 if __name__ == "__main__":
+    import sys
     usernames_file = "usernames_to_add.txt"
-    json_file = "../leetcode-elo/public/users_by_elo.json"
+    # Pass users_by_elo.ndjson to work on the NDJSON copy instead
+    json_file = sys.argv[1] if len(sys.argv) > 1 else "../leetcode-elo/public/users_by_elo.json"
     add_users_to_json(usernames_file, json_file)
     print("New users added successfully.")
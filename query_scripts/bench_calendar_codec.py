@@ -0,0 +1,53 @@
+import json
+import sys
+import time
+import random
+from datetime import date, timedelta
+from calendar_codec import encode_user, decode_user, days_to_weeks
+
+# Compare the packed calendar format with GitHub's weeks layout:
+#   python bench_calendar_codec.py [github_contributions.json] [synthetic user count]
+
+def synthetic_users(count, days=371):
+    start = date.today() - timedelta(days=days - 1)
+    rng = random.Random(0)
+    users = []
+    for i in range(count):
+        counts = [rng.choice([0, 0, 0, 1, 2, 3, 5, 8, 13]) for _ in range(days)]
+        users.append({
+            'github_username': f'user{i}',
+            'calendar_data': days_to_weeks((start + timedelta(days=d), c) for d, c in enumerate(counts))
+        })
+    return users
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main(filename, user_count):
+    users = synthetic_users(user_count)
+    if filename:
+        with open(filename, 'r') as f:
+            users = json.load(f) + users
+
+    original = json.dumps(users)
+    packed_users, encode_time = timed(lambda: [encode_user(user) for user in users])
+    packed = json.dumps(packed_users)
+    _, decode_time = timed(lambda: [decode_user(dict(user)) for user in json.loads(packed)])
+    _, parse_time = timed(lambda: json.loads(original))
+
+    print(f"Users:            {len(users)}")
+    print(f"Original size:    {len(original):,} bytes")
+    print(f"Packed size:      {len(packed):,} bytes ({len(packed) / len(original):.1%})")
+    print(f"Encode time:      {encode_time * 1000:.1f} ms")
+    print(f"Decode time:      {decode_time * 1000:.1f} ms (incl. JSON parse)")
+    print(f"Original parse:   {parse_time * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    filename = sys.argv[1] if len(sys.argv) > 1 else '../leetcode-elo/public/github_contributions.json'
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    main(filename, user_count)
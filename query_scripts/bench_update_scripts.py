@@ -0,0 +1,383 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import multiprocessing
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Benchmark the update scripts offline against local stand-ins for leetcode.com,
+# api.github.com and the KV Worker:
+#   python bench_update_scripts.py [--sizes 100,1000,10000] [--latency 20] [--error-rate 0.01] [--rate-limit 200]
+#
+# The stand-ins run in a child process so the peak memory reported is the
+# update scripts' own (tracemalloc, Python allocations only).
+
+SCENARIOS = ["leetcode-daily", "leetcode-weekly", "github-daily", "github-weekly"]
+
+
+class MockState:
+    """Counters and failure injection shared by the handlers of one service"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configure({})
+
+    def configure(self, config):
+        with self.lock:
+            self.latency = config.get("latency", 0.0)
+            self.jitter = config.get("jitter", 0.0)
+            self.error_rate = config.get("error_rate", 0.0)
+            self.rate_limit = config.get("rate_limit", 0)
+            self.rng = random.Random(config.get("seed", 0))
+            self.window = 0
+            self.window_requests = 0
+            self.stats = {"requests": 0, "errors": 0, "throttled": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def admit(self, bytes_in):
+        """Status to fail the request with (429 or 500), or None to serve it"""
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_in"] += bytes_in
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            status = None
+            second = int(time.monotonic())
+            if second != self.window:
+                self.window, self.window_requests = second, 0
+            self.window_requests += 1
+            if self.rate_limit and self.window_requests > self.rate_limit:
+                self.stats["throttled"] += 1
+                status = 429
+            elif self.rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                status = 500
+        time.sleep(delay)
+        return status
+
+    def sent(self, bytes_out):
+        with self.lock:
+            self.stats["bytes_out"] += bytes_out
+
+
+def synthetic_count(username, salt, low, high):
+    """Deterministic per-user number that changes with salt (e.g. the date)"""
+    digest = hashlib.sha1(f"{username}:{salt}".encode("utf-8")).digest()
+    return low + int.from_bytes(digest[:4], "little") % (high - low)
+
+
+def synthetic_days(username, start, end):
+    days = []
+    day = start
+    while day <= end:
+        days.append((day, synthetic_count(username, day.isoformat(), 0, 6)))
+        day += timedelta(days=1)
+    return days
+
+
+def leetcode_response(variables):
+    """Answer a batched (u0, u1, ...) or single-user LeetCode stats query"""
+    today = date.today().isoformat()
+
+    def stats(username):
+        solved = synthetic_count(username, today, 50, 3000)
+        return {"submitStatsGlobal": {"acSubmissionNum": [
+            {"difficulty": "All", "count": solved},
+            {"difficulty": "Easy", "count": solved // 3},
+        ]}}
+
+    def ranking(username):
+        return {"rating": float(synthetic_count(username, today, 1200, 3000))}
+
+    if "username" in variables:
+        name = variables["username"]
+        return {"data": {"matchedUser": stats(name), "userContestRanking": ranking(name)}}
+    data = {}
+    i = 0
+    while f"u{i}" in variables:
+        name = variables[f"u{i}"]
+        data[f"p{i}"] = stats(name)
+        data[f"r{i}"] = ranking(name)
+        i += 1
+    return {"data": data}
+
+
+def github_response(variables, state):
+    """Answer an aliased (c0, c1, ...) contributions query, full year or windowed"""
+    today = date.today()
+    data = {"rateLimit": {
+        "cost": 1,
+        "remaining": max(0, 5000 - state.stats["requests"]),
+        "resetAt": (datetime.utcnow() + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "limit": 5000,
+    }}
+    i = 0
+    while f"u{i}" in variables:
+        name = variables[f"u{i}"]
+        window = variables.get(f"f{i}")
+        start = date.fromisoformat(window[:10]) if window else today - timedelta(days=365)
+        days = synthetic_days(name, start, today)
+        weeks = {}
+        for day, count in days:
+            week = day - timedelta(days=(day.weekday() + 1) % 7)
+            weeks.setdefault(week, []).append({"contributionCount": count, "date": day.isoformat()})
+        calendar = {"weeks": [{"contributionDays": weeks[week]} for week in sorted(weeks)]}
+        if not window:
+            calendar["totalContributions"] = sum(count for _, count in days)
+        data[f"c{i}"] = {"contributionsCollection": {"contributionCalendar": calendar}}
+        i += 1
+    return {"data": data}
+
+
+def seed_worker(users):
+    """KV contents of a roster of synthetic users, as the "<prefix>:data" blobs and as shards (KV_SHARDED=1)"""
+    from kv_client import shard_key, index_key, record_hash
+    from calendar_codec import encode_user, days_to_weeks
+
+    store = {}
+    yesterday = datetime.now() - timedelta(days=1)
+    leetcode, github = [], []
+    registered = []
+    for i in range(users):
+        name = f"bench_user_{i}"
+        registered.append({"leetcode_username": name, "github_username": name, "display_name": name})
+        count = synthetic_count(name, "seed", 50, 3000)
+        # Every third user has been dormant for weeks, like much of a real roster
+        weekly = 0 if i % 3 == 0 else 5
+        leetcode.append({
+            "name": name, "display_name": name, "elo": 1500, "prev_elo": 1500, "is_new_user": False,
+            "prev_problem_count": count - weekly, "current_problem_delta": weekly, "current_problem_count": count,
+            "problems_each_week": [count - weekly * week for week in range(8, 0, -1)],
+        })
+        days = synthetic_days(name, yesterday.date() - timedelta(days=365), yesterday.date())
+        total = sum(count for _, count in days)
+        github.append(encode_user({
+            "github_username": name, "display_name": name,
+            "current_contributions": total, "prev_contributions": total, "contribution_delta": 0,
+            "contributions_each_week": [
+                {"date": (yesterday - timedelta(weeks=week)).strftime("%Y-%m-%d"), "count": total}
+                for week in range(4, 0, -1)
+            ],
+            "calendar_data": days_to_weeks(days),
+            "last_updated": yesterday.strftime("%Y-%m-%d %H:%M:%S"),
+        }))
+
+    store["users:list"] = json.dumps(registered)
+    store["leetcode:poll_state"] = json.dumps({
+        user["name"]: yesterday.strftime("%Y-%m-%d %H:%M:%S") for user in leetcode
+    })
+    for prefix, key_field, records in (("leetcode", "name", leetcode), ("github", "github_username", github)):
+        store[f"{prefix}:data"] = json.dumps(records)
+        hashes = {}
+        for record in records:
+            store[shard_key(prefix, record[key_field])] = json.dumps(record)
+            hashes[record[key_field]] = record_hash(record)
+        store[index_key(prefix)] = json.dumps({"users": list(hashes), "hashes": hashes})
+    return store
+
+
+def make_handler(service, state, store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            state.sent(len(body))
+
+        def read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def control(self, body):
+            """/__reset configures the mock (and seeds the Worker), /__stats reads the counters"""
+            if self.path.startswith("/__reset"):
+                config = json.loads(body or b"{}")
+                state.configure(config)
+                if service == "worker":
+                    store.clear()
+                    store.update(seed_worker(config.get("users", 0)))
+                self.reply(200, b"{}")
+            else:
+                with state.lock:
+                    stats = json.dumps(state.stats).encode("utf-8")
+                self.reply(200, stats)
+
+        def handle_request(self):
+            body = self.read_body() if self.command == "POST" else b""
+            if self.path.startswith("/__"):
+                return self.control(body)
+            status = state.admit(len(body) + len(self.path))
+            if status == 429:
+                return self.reply(429, b'{"error": "rate limited"}', {"Retry-After": "1"})
+            if status is not None:
+                return self.reply(status, b'{"error": "injected failure"}')
+
+            if service == "worker":
+                self.worker(body)
+            else:
+                variables = json.loads(body).get("variables", {})
+                if service == "leetcode":
+                    response = leetcode_response(variables)
+                else:
+                    response = github_response(variables, state)
+                self.reply(200, json.dumps(response).encode("utf-8"))
+
+        def worker(self, body):
+            """The Worker's shape: GET ?key= -> {value}, POST {key, value}, sha256 ETags"""
+            if self.command == "GET":
+                key = parse_qs(urlsplit(self.path).query).get("key", [""])[0]
+                value = store.get(key)
+                etag = hashlib.sha256(value.encode("utf-8")).hexdigest() if value is not None else None
+                if etag and self.headers.get("If-None-Match", "").strip('"') == etag:
+                    return self.reply(304)
+                headers = {"ETag": f'"{etag}"'} if etag else {}
+                self.reply(200, json.dumps({"value": value}).encode("utf-8"), headers)
+            else:
+                payload = json.loads(body)
+                store[payload["key"]] = payload["value"]
+                etag = hashlib.sha256(payload["value"].encode("utf-8")).hexdigest()
+                self.reply(200, b'{"success": true}', {"ETag": f'"{etag}"'})
+
+        do_GET = handle_request
+        do_POST = handle_request
+
+    return Handler
+
+
+def serve_mocks(conn):
+    """Child process: start the three mock servers and report their ports"""
+    ports = {}
+    for service in ("leetcode", "github", "worker"):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service, MockState(), {}))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        ports[service] = server.server_address[1]
+    conn.send(ports)
+    conn.recv()
+
+
+def configure_environment(workdir):
+    """Point journals, the time-series DB and the KV cache at a scratch directory"""
+    os.environ["RUN_JOURNAL_DIR"] = os.path.join(workdir, "journal")
+    os.environ["TIMESERIES_DB"] = os.path.join(workdir, "timeseries.db")
+    os.environ["KV_CACHE_DIR"] = os.path.join(workdir, "kv_cache")
+    # Injected failures should cost milliseconds of backoff, not seconds
+    os.environ.setdefault("HTTP_BACKOFF_BASE", "0.05")
+    os.environ.setdefault("HTTP_BACKOFF_MAX", "1")
+
+
+def reset_workdir(workdir):
+    for name in ("journal", "kv_cache"):
+        shutil.rmtree(os.path.join(workdir, name), ignore_errors=True)
+    if os.path.exists(os.path.join(workdir, "timeseries.db")):
+        os.remove(os.path.join(workdir, "timeseries.db"))
+
+
+def run_scenario(scenario):
+    """Run one real update code path end to end: roster and data from KV, fetch, publish"""
+    import get_leetcode_users_elo_problems_solved as leetcode
+    import get_github_contributions as github
+
+    source, schedule = scenario.split("-")
+    if source == "leetcode":
+        leetcode.main(schedule, with_elo=True)
+    else:
+        github.main(schedule)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the update scripts against local mock services")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated user counts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=20, help="ms added to every mock response")
+    parser.add_argument("--jitter", type=float, default=10, help="extra random ms per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests/s per service before 429s, 0 = off")
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_update_")
+    configure_environment(workdir)
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve_mocks, args=(child,), daemon=True)
+    process.start()
+    ports = parent.recv()
+
+    # Imported after configure_environment, these read their settings at import
+    import requests
+    import kv_client
+    import leetcode_client
+    import github_client
+
+    urls = {service: f"http://127.0.0.1:{port}" for service, port in ports.items()}
+    leetcode_client.GRAPHQL_URL = f"{urls['leetcode']}/graphql"
+    github_client.GITHUB_API_URL = f"{urls['github']}/graphql"
+    kv_client.WORKER_URL = urls["worker"]
+
+    def control(service, path, payload=None):
+        return requests.post(f"{urls[service]}{path}", json=payload or {}).json()
+
+    rows = []
+    try:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            for scenario in args.scenarios.split(","):
+                reset_workdir(workdir)
+                config = {
+                    "latency": args.latency / 1000, "jitter": args.jitter / 1000,
+                    "error_rate": args.error_rate, "rate_limit": args.rate_limit,
+                }
+                for service in urls:
+                    control(service, "/__reset", {**config, "users": size})
+
+                output = sys.stdout if args.verbose else io.StringIO()
+                tracemalloc.start()
+                start = time.perf_counter()
+                with redirect_stdout(output):
+                    run_scenario(scenario)
+                wall = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                stats = {service: control(service, "/__stats") for service in urls}
+                requests_made = sum(s["requests"] for s in stats.values())
+                rows.append({
+                    "scenario": scenario, "users": size, "wall": wall,
+                    "users_per_second": size / wall, "requests": requests_made,
+                    "requests_per_second": requests_made / wall,
+                    "retried": sum(s["errors"] + s["throttled"] for s in stats.values()),
+                    "mb_up": sum(s["bytes_in"] for s in stats.values()) / 1e6,
+                    "mb_down": sum(s["bytes_out"] for s in stats.values()) / 1e6,
+                    "peak_mb": peak / 1e6,
+                })
+                row = rows[-1]
+                print(
+                    f"{scenario:16} {size:>6} users  {wall:7.2f}s  {row['users_per_second']:8.1f} users/s  "
+                    f"{requests_made:>6} req ({row['requests_per_second']:6.1f}/s, {row['retried']} retried)  "
+                    f"up {row['mb_up']:7.2f} MB  down {row['mb_down']:7.2f} MB  peak {row['peak_mb']:7.1f} MB"
+                )
+    finally:
+        parent.send("stop")
+        process.join(timeout=5)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import base64
+import struct
+import zlib
+from datetime import date, timedelta
+
+# Compact calendar layout stored in KV instead of GitHub's weeks/contributionDays:
+#   {"format": "packed-v1", "start": "YYYY-MM-DD", "days": N,
+#    "counts": base64(zlib(N little-endian uint32 daily counts))}
+# Day i is start + i days, weeks start on Sunday like GitHub's calendar.
+PACKED_FORMAT = "packed-v1"
+
+
+def is_packed(calendar):
+    return isinstance(calendar, dict) and calendar.get("format") == PACKED_FORMAT
+
+
+def calendar_days(weeks):
+    """Flatten GitHub's weeks into a date-sorted list of (date, count)"""
+    days = [
+        (date.fromisoformat(day["date"]), day["contributionCount"])
+        for week in weeks
+        for day in week.get("contributionDays", [])
+    ]
+    days.sort()
+    return days
+
+
+def days_to_weeks(days):
+    """Group contiguous (date, count) pairs back into GitHub's weeks layout"""
+    weeks = []
+    for day, count in days:
+        # Python's Sunday is weekday 6, GitHub weeks run Sunday..Saturday
+        if not weeks or day.weekday() == 6:
+            weeks.append({"contributionDays": []})
+        weeks[-1]["contributionDays"].append(
+            {"contributionCount": count, "date": day.isoformat()}
+        )
+    return weeks
+
+
+def merge_calendar(weeks, new_weeks, start=None):
+    """
+    Merge newly fetched weeks into a stored calendar. Days in new_weeks replace
+    the stored counts for the same date; days before start are dropped.
+    Returns (weeks, total contributions of the merged days).
+    """
+    merged = dict(calendar_days(weeks or []))
+    merged.update(calendar_days(new_weeks or []))
+    days = sorted(
+        (day, count) for day, count in merged.items() if start is None or day >= start
+    )
+    return days_to_weeks(days), sum(count for _, count in days)
+
+
+def encode_calendar(weeks):
+    """Pack a weeks list into the compact format, missing days count as 0"""
+    if is_packed(weeks):
+        return weeks
+    days = calendar_days(weeks or [])
+    if not days:
+        return []
+
+    start = days[0][0]
+    counts = [0] * ((days[-1][0] - start).days + 1)
+    for day, count in days:
+        counts[(day - start).days] = count
+
+    raw = struct.pack(f"<{len(counts)}I", *counts)
+    return {
+        "format": PACKED_FORMAT,
+        "start": start.isoformat(),
+        "days": len(counts),
+        "counts": base64.b64encode(zlib.compress(raw, 9)).decode("ascii"),
+    }
+
+
+def decode_counts(packed):
+    """Daily counts of a packed calendar as a list of ints"""
+    raw = zlib.decompress(base64.b64decode(packed["counts"]))
+    return list(struct.unpack(f"<{packed['days']}I", raw))
+
+
+def decode_calendar(packed):
+    """Unpack the compact format back into GitHub's weeks list (non-packed input is returned as-is)"""
+    if not is_packed(packed):
+        return packed
+    start = date.fromisoformat(packed["start"])
+    return days_to_weeks(
+        (start + timedelta(days=i), count) for i, count in enumerate(decode_counts(packed))
+    )
+
+
+def encode_user(user):
+    """Copy of a github:data record with its calendar_data packed"""
+    if "calendar_data" not in user:
+        return user
+    return {**user, "calendar_data": encode_calendar(user["calendar_data"])}
+
+
+def decode_user(user):
+    """github:data record with its calendar_data unpacked in place"""
+    if is_packed(user.get("calendar_data")):
+        user["calendar_data"] = decode_calendar(user["calendar_data"])
+    return user
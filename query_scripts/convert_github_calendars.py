@@ -0,0 +1,30 @@
+import json
+import sys
+from calendar_codec import encode_user, decode_user
+from kv_client import get_github_data, put_github_data
+
+# Repack existing GitHub data into the compact calendar format.
+# get_github_data reads both formats and put_github_data always packs, so a
+# read/write round trip converts KV. Pass a JSON file to convert it in place.
+
+def convert_file(filename):
+    with open(filename, 'r') as f:
+        users = json.load(f)
+    converted = [encode_user(user) for user in users]
+    for user, packed in zip(users, converted):
+        if decode_user(dict(packed)).get('calendar_data') != user.get('calendar_data'):
+            print(f"✗ Round trip mismatch for {user.get('github_username')}, leaving {filename} alone")
+            return
+    with open(filename, 'w') as f:
+        json.dump(converted, f, indent=4)
+    print(f"✓ Converted {len(converted)} users in {filename}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for filename in sys.argv[1:]:
+            convert_file(filename)
+    else:
+        print("Converting github:data in KV...")
+        users = get_github_data()
+        put_github_data(users)
+        print(f"✓ Converted {len(users)} GitHub users")
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+async def _fetch_all_async(items, fetch, max_concurrency):
+    """Run the blocking fetch for every item on a bounded pool of worker threads"""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        async def fetch_one(item):
+            async with semaphore:
+                return await loop.run_in_executor(executor, fetch, item)
+
+        # A failing item comes back as its exception instead of aborting the run
+        return await asyncio.gather(
+            *(fetch_one(item) for item in items), return_exceptions=True
+        )
+
+
+def fetch_all(items, fetch, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Call fetch(item) for every item with at most max_concurrency requests in flight.
+    Returns (results, stats) where results are in the same order as items; an
+    item whose fetch raised has the exception as its result.
+    """
+    items = list(items)
+    max_concurrency = max(1, int(max_concurrency))
+
+    start = time.perf_counter()
+    results = asyncio.run(_fetch_all_async(items, fetch, max_concurrency)) if items else []
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "requests": len(items),
+        "failed": sum(isinstance(result, Exception) for result in results),
+        "elapsed": elapsed,
+        "requests_per_second": len(items) / elapsed if elapsed > 0 else 0.0,
+        "max_concurrency": max_concurrency,
+    }
+    return results, stats
+
+
+def print_run_stats(stats, label="Fetch"):
+    """Print a one-line summary of a fetch_all run"""
+    print(
+        f"{label} finished: {stats['requests']} requests in {stats['elapsed']:.2f}s "
+        f"({stats['requests_per_second']:.1f} req/s, concurrency {stats['max_concurrency']}, "
+        f"{stats['failed']} failed)"
+    )
@@ -1,7 +1,19 @@
-import requests
 import json
+import os
 import sys
+import time
+import threading
+import http_transport
 from cookies import cookies
+from fetch_engine import fetch_all, print_run_stats
+from run_journal import atomic_write_json
+
+INPUT_FILE = "leetcode-problem-analysis/leetcode_problem_data.json"
+OUTPUT_FILE = "leetcode-problem-analysis/leetcode_problems_with_categories.json"
+# Append-only {"TitleSlug", "Topics", "fetched_at"} lines written by --incremental runs
+CHECKPOINT_FILE = "leetcode-problem-analysis/leetcode_problem_topics.ndjson"
+
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 4))
 
 headers = {
     "Accept": "application/json",
@@ -14,7 +26,8 @@ headers = {
 
 def get_problem_topics(title_slug):
     """
-    Fetch problem topics/categories using LeetCode GraphQL API
+    Fetch problem topics/categories using LeetCode GraphQL API.
+    Returns None when the problem couldn't be fetched.
     """
     url = "https://leetcode.com/graphql"
     payload = {
@@ -38,7 +51,7 @@ def get_problem_topics(title_slug):
     }
 
     try:
-        response = requests.post(url, headers=headers, cookies=cookies, json=payload)
+        response = http_transport.post(url, headers=headers, cookies=cookies, json=payload)
         if response.status_code == 200:
             data = response.json()
             if data.get("data") and data["data"].get("question"):
@@ -47,19 +60,19 @@ def get_problem_topics(title_slug):
                 return topics
             else:
                 print(f"No data found for {title_slug}")
-                return []
+                return None
         else:
             print(f"Failed to fetch topics for {title_slug}: {response.status_code}")
-            return []
+            return None
     except Exception as e:
         print(f"Error fetching topics for {title_slug}: {e}")
-        return []
+        return None
 
 
 def main(limit=None):
     # Load existing problem data
-    input_file = "leetcode-problem-analysis/leetcode_problem_data.json"
-    output_file = "leetcode-problem-analysis/leetcode_problems_with_categories.json"
+    input_file = INPUT_FILE
+    output_file = OUTPUT_FILE
 
     print(f"Loading problem data from {input_file}...")
     with open(input_file, "r") as f:
@@ -81,7 +94,7 @@ def main(limit=None):
 
         print(f"Processing {i+1}/{len(problems)}: {problem.get('Title')} ({title_slug})")
 
-        topics = get_problem_topics(title_slug)
+        topics = get_problem_topics(title_slug) or []
         problem_with_topics = problem.copy()
         problem_with_topics["Topics"] = topics
         problems_with_categories.append(problem_with_topics)
@@ -109,7 +122,98 @@ def main(limit=None):
         print(f"  - {topic}")
 
 
+def load_known_topics(output_file=OUTPUT_FILE, checkpoint_file=CHECKPOINT_FILE):
+    """
+    Topics already fetched, as {slug: (topics, fetched_at)}. Entries of the
+    output JSON count as fetched when that file was last written; checkpoint
+    lines override them, the last line for a slug wins.
+    """
+    known = {}
+    if os.path.exists(output_file):
+        written_at = os.path.getmtime(output_file)
+        with open(output_file, "r") as f:
+            for problem in json.load(f):
+                if "Topics" in problem:
+                    known[problem["TitleSlug"]] = (problem["Topics"], written_at)
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from an interrupted run
+                    continue
+                known[entry["TitleSlug"]] = (entry["Topics"], entry["fetched_at"])
+    return known
+
+
+def crawl(ttl_days=None, concurrency=CRAWL_CONCURRENCY):
+    """
+    Incremental mode: fetch topics only for slugs missing from the known topics
+    (or older than ttl_days), concurrently, streaming each result to the
+    checkpoint file. The output JSON is written once at the end.
+    """
+    with open(INPUT_FILE, "r") as f:
+        problems = json.load(f)
+    known = load_known_topics()
+    if not os.path.exists(CHECKPOINT_FILE):
+        # Seed the checkpoint so output entries keep their age once the
+        # output JSON gets rewritten below
+        with open(CHECKPOINT_FILE, "w") as f:
+            for slug, (topics, fetched_at) in known.items():
+                f.write(json.dumps({"TitleSlug": slug, "Topics": topics, "fetched_at": fetched_at}) + "\n")
+
+    cutoff = time.time() - ttl_days * 86400 if ttl_days is not None else None
+    todo = [
+        problem["TitleSlug"]
+        for problem in problems
+        if problem.get("TitleSlug")
+        and (
+            problem["TitleSlug"] not in known
+            or (cutoff is not None and known[problem["TitleSlug"]][1] < cutoff)
+        )
+    ]
+    print(f"{len(problems)} problems, {len(todo)} need topics")
+
+    lock = threading.Lock()
+
+    def fetch(slug):
+        topics = get_problem_topics(slug)
+        if topics is None:
+            # Not recorded, so the next run tries again
+            return None
+        fetched_at = time.time()
+        with lock:
+            with open(CHECKPOINT_FILE, "a") as f:
+                f.write(json.dumps({"TitleSlug": slug, "Topics": topics, "fetched_at": fetched_at}) + "\n")
+            known[slug] = (topics, fetched_at)
+        return topics
+
+    if not todo:
+        print("Nothing to fetch, output is up to date")
+        return
+    results, stats = fetch_all(todo, fetch, concurrency)
+    print_run_stats(stats, "Topic crawl")
+    print(f"{sum(result is not None for result in results)} of {len(todo)} fetched")
+
+    problems_with_categories = []
+    for problem in problems:
+        if problem.get("TitleSlug") in known:
+            problems_with_categories.append(
+                {**problem, "Topics": known[problem["TitleSlug"]][0]}
+            )
+    atomic_write_json(OUTPUT_FILE, problems_with_categories, indent=2)
+    print(f"Saved {len(problems_with_categories)} problems to {OUTPUT_FILE}")
+
+
 if __name__ == "__main__":
+    if "--incremental" in sys.argv:
+        ttl_days = None
+        if "--ttl-days" in sys.argv:
+            ttl_days = float(sys.argv[sys.argv.index("--ttl-days") + 1])
+        crawl(ttl_days)
+        sys.exit(0)
+
     limit = None
     if len(sys.argv) > 1:
         try:
@@ -117,6 +221,7 @@ if __name__ == "__main__":
             print(f"Limiting to {limit} problems")
         except ValueError:
             print("Usage: python fetch_problem_categories.py [limit]")
+            print("       python fetch_problem_categories.py --incremental [--ttl-days N]")
             print("Example: python fetch_problem_categories.py 50")
             sys.exit(1)
     main(limit)
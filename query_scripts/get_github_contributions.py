@@ -1,62 +1,53 @@
-import requests
-import json
-from datetime import datetime
-from dotenv import load_dotenv
-import os
+from datetime import datetime, timedelta
+from fetch_engine import fetch_all, print_run_stats
 from kv_client import get_users_list, get_github_data, put_github_data
-
-# Load environment variables
-load_dotenv()
-GITHUB_TOKEN = os.getenv('GITHUB-PAT')
-GITHUB_API_URL = "https://api.github.com/graphql"
-
-def get_github_contributions(username):
-    """Fetch GitHub contributions using GraphQL API"""
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Content-Type": "application/json"
-    }
-
-    query = """
-    query($username: String!) {
-      user(login: $username) {
-        contributionsCollection {
-          contributionCalendar {
-            totalContributions
-            weeks {
-              contributionDays {
-                contributionCount
-                date
-              }
-            }
-          }
-        }
-      }
-    }
+from timeseries_store import add_weekly_point, log_weekly_points
+from run_journal import RunJournal
+from calendar_codec import merge_calendar
+from leaderboard_server import publish_leaderboard
+from schema_migrations import SCHEMA_VERSION_FIELD, current_version
+from github_client import (
+    GITHUB_BATCH_SIZE,
+    GITHUB_CONCURRENCY,
+    RateLimitBudget,
+    get_contributions_batch,
+)
+
+# The calendar covers the trailing year, like GitHub's default contributionsCollection
+CALENDAR_DAYS = 365
+
+def incremental_since(user):
     """
+    Start of the window to re-fetch for a user, or None when they need a full fetch
+    (never updated, no stored calendar, or last update older than the calendar).
+    The day before last_updated is included so late contributions and time zone
+    differences on the boundary days are picked up.
+    """
+    if not user.get("last_updated") or not user.get("calendar_data"):
+        return None
+    try:
+        last_updated = datetime.strptime(user["last_updated"], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    since = last_updated - timedelta(days=1)
+    if datetime.now() - since >= timedelta(days=CALENDAR_DAYS):
+        return None
+    return since
 
-    payload = {
-        "query": query,
-        "variables": {"username": username}
-    }
-
-    response = requests.post(GITHUB_API_URL, headers=headers, json=payload)
-
-    if response.status_code == 200:
-        data = response.json()
-        if data.get("data") and data["data"].get("user"):
-            contributions = data["data"]["user"]["contributionsCollection"]["contributionCalendar"]
-            return {
-                "total_contributions": contributions["totalContributions"],
-                "calendar_data": contributions["weeks"]
-            }
-        else:
-            print(f"User {username} does not exist on GitHub")
-            return None
+def apply_calendar(user, contributions):
+    """
+    Set a user's calendar and current_contributions from a full or incremental fetch.
+    Incremental windows are merged into the stored calendar, and the total is
+    recomputed over the merged trailing year.
+    """
+    if "total_contributions" in contributions:
+        user["calendar_data"] = contributions["calendar_data"]
+        user["current_contributions"] = contributions["total_contributions"]
     else:
-        print(f"Failed to retrieve GitHub data for {username}: {response.status_code}")
-        print(f"Response: {response.text}")
-        return None
+        start = datetime.now().date() - timedelta(days=CALENDAR_DAYS)
+        user["calendar_data"], user["current_contributions"] = merge_calendar(
+            user.get("calendar_data"), contributions["calendar_data"], start
+        )
 
 def load_existing_data(filename=None):
     """Load existing GitHub contributions data from KV (filename param kept for compatibility)"""
@@ -64,29 +55,80 @@ def load_existing_data(filename=None):
 
 def update_json(filename, users):
     """Update KV with new contribution data (filename param kept for compatibility)"""
-    put_github_data(users)
+    ok = put_github_data(users)
     print(f"Updated {len(users)} users in KV")
+    return ok
+
+def finish_run(journal, valid_users, publish=True):
+    """Publish a finished run now, or hand it back to be published later"""
+    if publish:
+        publish_run(journal, valid_users)
+        return None
+    return journal, valid_users
+
+def publish_run(journal, valid_users):
+    """Journal the final output, publish it, and drop the journal once it's in KV"""
+    journal.save_output(valid_users)
+    if update_json("../leetcode-elo/public/github_contributions.json", valid_users):
+        publish_leaderboard("github", valid_users)
+        journal.complete()
+    else:
+        print(f"Publishing failed, re-run to retry from {journal.path}")
+
+def fetch_contributions(existing_users, journal, since=None, batch_size=GITHUB_BATCH_SIZE):
+    """
+    Fetch contributions of every user in aliased batches, pacing requests on
+    GitHub's point budget. since maps usernames to the start of their window.
+    Returns {username: contributions or None, or False when their batch failed
+    and they keep their previous data}. Users already in the journal are not
+    fetched again and every batch is journaled as soon as it comes back.
+    """
+    usernames = [user["github_username"] for user in existing_users]
+    results = {name: journal.get(name) for name in usernames if name in journal}
+    usernames = [name for name in usernames if name not in journal]
+
+    budget = RateLimitBudget()
+
+    def fetch_batch(batch):
+        result = get_contributions_batch(batch, budget, since)
+        journal.record_many(result)
+        return result
+
+    batch_size = max(1, batch_size)
+    batches = [usernames[i:i + batch_size] for i in range(0, len(usernames), batch_size)]
+    print(f"Getting GitHub contributions of {len(usernames)} users in {len(batches)} batches...")
+    batch_results, stats = fetch_all(batches, fetch_batch, GITHUB_CONCURRENCY)
+    print_run_stats(stats, "GitHub contributions fetch")
+    budget.print_stats()
+
+    for batch, result in zip(batches, batch_results):
+        if isinstance(result, Exception):
+            print(f"Keeping previous data for batch starting at {batch[0]}: {result}")
+            results.update((username, False) for username in batch)
+        else:
+            results.update(result)
+    return results
+
+def weekly_update(existing_users, publish=True):
+    """
+    Weekly update with historical tracking. With publish=False the run is
+    returned as (journal, valid_users) for the caller to publish.
+    """
+    journal = RunJournal("github-weekly", "weekly")
+    if journal.output is not None:
+        return finish_run(journal, journal.output, publish)
 
-def weekly_update(existing_users):
-    """Weekly update with historical tracking"""
+    results = fetch_contributions(existing_users, journal)
+    today = datetime.now().strftime("%Y-%m-%d")
+    points = []
     valid_users = []
     for user in existing_users:
-        username = user["github_username"]
-        print(f"Getting GitHub contributions for {username}...")
-
-        contributions = get_github_contributions(username)
-        if contributions is not None:
+        contributions = results[user["github_username"]]
+        if contributions is False:
+            valid_users.append(user)
+        elif contributions is not None:
             # Update historical data
-            if user.get("contributions_each_week", []):
-                user["contributions_each_week"].append({
-                    "date": datetime.now().strftime("%Y-%m-%d"),
-                    "count": contributions["total_contributions"]
-                })
-            else:
-                user["contributions_each_week"] = [{
-                    "date": datetime.now().strftime("%Y-%m-%d"),
-                    "count": contributions["total_contributions"]
-                }]
+            points.append(add_weekly_point("contributions", user, contributions["total_contributions"], today))
 
             # Store full calendar data
             user["calendar_data"] = contributions["calendar_data"]
@@ -94,35 +136,40 @@ def weekly_update(existing_users):
             user["current_contributions"] = contributions["total_contributions"]
             user["contribution_delta"] = contributions["total_contributions"] - user["prev_contributions"]
             user["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            print(f"Total contributions: {contributions['total_contributions']}")
             valid_users.append(user)
 
-    update_json("../leetcode-elo/public/github_contributions.json", valid_users)
+    log_weekly_points("contributions", valid_users, points)
+    return finish_run(journal, valid_users, publish)
 
-def daily_update(existing_users):
-    """Daily update of GitHub contributions"""
+def daily_update(existing_users, full=False, publish=True):
+    """
+    Daily update of GitHub contributions. Unless full, users with a recent
+    calendar only have the days since their last update fetched.
+    """
+    journal = RunJournal("github-daily-full" if full else "github-daily", "daily")
+    if journal.output is not None:
+        return finish_run(journal, journal.output, publish)
+
+    since = {} if full else {user["github_username"]: incremental_since(user) for user in existing_users}
+    results = fetch_contributions(existing_users, journal, since)
     valid_users = []
+    incremental = 0
     for user in existing_users:
-        username = user["github_username"]
-        print(f"Getting GitHub contributions for {username}...")
-
-        contributions = get_github_contributions(username)
-        if contributions is not None:
-            user["current_contributions"] = contributions["total_contributions"]
-            user["contribution_delta"] = contributions["total_contributions"] - user.get("prev_contributions", contributions["total_contributions"])
+        contributions = results[user["github_username"]]
+        if contributions is False:
+            valid_users.append(user)
+        elif contributions is not None:
+            incremental += "total_contributions" not in contributions
+            apply_calendar(user, contributions)
+            user["contribution_delta"] = user["current_contributions"] - user.get("prev_contributions", user["current_contributions"])
             user["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"Total contributions: {contributions['total_contributions']}")
             valid_users.append(user)
 
-    update_json("../leetcode-elo/public/github_contributions.json", valid_users)
-
-def main(update_type):
-    """Main function"""
-    # Get registered users from KV
-    registered_users = get_users_list()
-    print(f"Found {len(registered_users)} registered users")
+    print(f"{incremental} of {len(valid_users)} users fetched incrementally")
+    return finish_run(journal, valid_users, publish)
 
+def prepare_users(registered_users):
+    """Existing GitHub records from KV plus fresh records for newly registered users"""
     # Load existing GitHub data from KV
     existing_data = load_existing_data()
 
@@ -131,8 +178,9 @@ def main(update_type):
 
     # Initialize new users who don't have data yet
     for reg_user in registered_users:
-        username = reg_user['github_username']
-        if username not in data_map:
+        username = reg_user.get('github_username')
+        # Registrations imported from a list of LeetCode usernames may have no GitHub account
+        if username and username not in data_map:
             print(f"Initializing new user: {username}")
             data_map[username] = {
                 'github_username': username,
@@ -142,25 +190,33 @@ def main(update_type):
                 'contribution_delta': 0,
                 'contributions_each_week': [],
                 'calendar_data': [],
-                'last_updated': ''
+                'last_updated': '',
+                SCHEMA_VERSION_FIELD: current_version('github')
             }
 
     # Convert map back to list
-    existing_users = list(data_map.values())
+    return list(data_map.values())
+
+def main(update_type, full=False):
+    """Main function"""
+    # Get registered users from KV
+    registered_users = get_users_list()
+    print(f"Found {len(registered_users)} registered users")
+    existing_users = prepare_users(registered_users)
 
     if update_type == "weekly":
         weekly_update(existing_users)
     elif update_type == "daily":
-        daily_update(existing_users)
+        daily_update(existing_users, full)
     else:
-        print("Usage: python get_github_contributions.py <weekly|daily>")
+        print("Usage: python get_github_contributions.py <weekly|daily> [--full]")
 
     print("Finished updating GitHub contributions data.")
 
 if __name__ == "__main__":
     import sys
     if len(sys.argv) < 2:
-        print("Usage: python get_github_contributions.py <weekly|daily>")
+        print("Usage: python get_github_contributions.py <weekly|daily> [--full]")
     else:
         update_type = sys.argv[1]
-        main(update_type)
+        main(update_type, full="--full" in sys.argv)
@@ -1,93 +1,22 @@
-import requests
 import sys
 import json
+import os
 from datetime import datetime
-from cookies import cookies
-from kv_client import get_users_list, get_leetcode_data, put_leetcode_data
-
-# Define the headers and cookies as given in your template
-
-
-headers = {
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.5",
-    "Connection": "keep-alive",
-    "Sec-Fetch-Dest": "document",
-    "Sec-Fetch-Mode": "navigate",
-    "Sec-Fetch-Site": "none",
-    "Sec-Fetch-User": "?1",
-    "Upgrade-Insecure-Requests": "1",
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0",
-}
-
-
-def get_problems_solved(username):
-    url = "https://leetcode.com/graphql"
-    payload = {
-        "operationName": "userProblemsSolved",
-        "query": """
-        query userProblemsSolved($username: String!) {
-            allQuestionsCount {
-                difficulty
-                count
-            }
-            matchedUser(username: $username) {
-                problemsSolvedBeatsStats {
-                    difficulty
-                    percentage
-                }
-                submitStatsGlobal {
-                    acSubmissionNum {
-                        difficulty
-                        count
-                    }
-                }
-            }
-        }
-        """,
-        "variables": {"username": username},
-    }
-    response = requests.post(url, headers=headers, cookies=cookies, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        # Check if the user exists
-        if data.get("data") and data["data"].get("matchedUser"):
-            total_problems_solved = data["data"]["matchedUser"]["submitStatsGlobal"][
-                "acSubmissionNum"
-            ][0]["count"]
-            return total_problems_solved
-        else:
-            print(f"User {username} does not exist, skipping...")
-            return None
-    else:
-        print(
-            f"Failed to retrieve problem stats for {username}: {response.status_code}"
-        )
-        return None
+from kv_client import get_users_list, get_leetcode_data, put_leetcode_data, get_quarantine
+from fetch_engine import fetch_all, print_run_stats, DEFAULT_MAX_CONCURRENCY
+from leetcode_client import get_user_stats_batch
+from query_users_elo_daily import update_user_elo
+from timeseries_store import add_weekly_point, log_weekly_points
+from run_journal import RunJournal
+from poll_scheduler import load_poll_state, save_poll_state, select_due, mark_polled, print_schedule_summary
+from leaderboard_server import publish_leaderboard
+from schema_migrations import SCHEMA_VERSION_FIELD, current_version
 
+# Number of GraphQL requests allowed in flight at once
+MAX_CONCURRENCY = int(os.getenv("LEETCODE_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
 
-def get_elo_of_leetcoder(username):
-    url = "https://leetcode.com/graphql"
-    payload = {
-        "operationName": "userContestRankingInfo",
-        "query": """
-        query userContestRankingInfo($username: String!) {
-            userContestRanking(username: $username) {
-                rating
-            }
-        }
-        """,
-        "variables": {"username": username},
-    }
-    response = requests.post(url, headers=headers, cookies=cookies, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        return data["data"]["userContestRanking"]["rating"]
-    else:
-        print(
-            "Failed to retrieve data for {}: {}".format(username, response.status_code)
-        )
-        return None
+# Number of users aliased into a single GraphQL request
+BATCH_SIZE = int(os.getenv("LEETCODE_BATCH_SIZE", 20))
 
 
 def load_existing_elos(filename=None):
@@ -97,8 +26,27 @@ def load_existing_elos(filename=None):
 
 def update_json(filename, users):
     """Update KV with new data (filename param kept for compatibility)"""
-    put_leetcode_data(users)
+    ok = put_leetcode_data(users)
     print(f"Updated {len(users)} users in KV")
+    return ok
+
+
+def publish_run(journal, valid_users):
+    """Journal the final output, publish it, and drop the journal once it's in KV"""
+    journal.save_output(valid_users)
+    if update_json("../leetcode-elo/public/users_by_elo.json", valid_users):
+        publish_leaderboard("leetcode", valid_users)
+        journal.complete()
+    else:
+        print(f"Publishing failed, re-run to retry from {journal.path}")
+
+
+def finish_run(journal, valid_users, publish=True):
+    """Publish a finished run now, or hand it back to be published later"""
+    if publish:
+        publish_run(journal, valid_users)
+        return None
+    return journal, valid_users
 
 
 def read_usernames_from_file(filename):
@@ -115,13 +63,76 @@ def write_elos_to_json(filename, user_elos):
         json.dump(data, file, indent=4)
 
 
-def daily_update(existing_users):
+def fetch_user_stats(existing_users, include_rating=False, batch_size=BATCH_SIZE, journal=None):
+    """
+    Fetch stats of every user in concurrent batches.
+    Returns ({username: stats or None}, set of usernames whose batch failed).
+    With a journal, users it already holds are not fetched again and every
+    batch is journaled as soon as it comes back.
+    """
+    usernames = [user["name"] for user in existing_users]
+    user_stats = {}
+    if journal is not None:
+        user_stats = {name: journal.get(name) for name in usernames if name in journal}
+        usernames = [name for name in usernames if name not in journal]
+
+    def fetch_batch(batch):
+        result = get_user_stats_batch(batch, include_rating)
+        if journal is not None:
+            journal.record_many(result)
+        return result
+
+    batch_size = max(1, batch_size)
+    batches = [
+        usernames[i:i + batch_size] for i in range(0, len(usernames), batch_size)
+    ]
+    print(f"Getting stats of {len(usernames)} users in {len(batches)} batches...")
+    batch_results, stats = fetch_all(batches, fetch_batch, MAX_CONCURRENCY)
+    print_run_stats(stats, "LeetCode stats fetch")
+
+    failed_users = set()
+    for batch, result in zip(batches, batch_results):
+        if isinstance(result, Exception):
+            print(f"Batch starting at {batch[0]} failed: {result}")
+            failed_users.update(batch)
+        else:
+            user_stats.update(result)
+    return user_stats, failed_users
+
+
+def daily_update(existing_users, with_elo=False, publish=True, sweep=False):
+    """
+    Daily refresh of problem counts (and ratings with_elo). Only users the poll
+    scheduler considers due are fetched unless sweep is set; the others keep
+    their data as-is. With publish=False the run is returned as
+    (journal, valid_users) for the caller to publish.
+    """
+    journal = RunJournal("leetcode-daily-elo" if with_elo else "leetcode-daily", "daily")
+    if journal.output is not None:
+        return finish_run(journal, journal.output, publish)
+
+    poll_state = load_poll_state()
+    due_users, skipped_users = (existing_users, []) if sweep else select_due(existing_users, poll_state)
+    print_schedule_summary(due_users, skipped_users, BATCH_SIZE)
+    user_stats, failed_users = fetch_user_stats(
+        due_users, include_rating=with_elo, journal=journal
+    )
+    skipped = {user["name"] for user in skipped_users}
     valid_users = []
     for user in existing_users:
         username = user["name"]
-        print("Getting problem count of...", username)
-        problems_solved_count = get_problems_solved(username)
-        if problems_solved_count is not None:
+        stats = user_stats.get(username)
+        if username in skipped:
+            valid_users.append(user)
+        elif username in failed_users:
+            # A transient failure is not a missing user, keep last known data
+            print(f"Keeping previous data for {username}, fetch failed")
+            valid_users.append(user)
+        elif stats is not None:
+            problems_solved_count = stats["problems_solved"]
+            if with_elo:
+                update_user_elo(user, stats["rating"])
+            mark_polled(poll_state, username)
             print("COUNT WAS", problems_solved_count)
             old_problems_count = user.get("prev_problem_count")
             user["current_problem_count"] = problems_solved_count
@@ -133,28 +144,42 @@ def daily_update(existing_users):
                 )
             print("Problems solved by user...", problems_solved_count)
             valid_users.append(user)
-    update_json("../leetcode-elo/public/users_by_elo.json", valid_users)
-    pass
+    # Saved before publishing: a failed publish is resumed from the journal
+    if due_users:
+        save_poll_state(poll_state)
+    return finish_run(journal, valid_users, publish)
+
 
+def weekly_update(existing_users, with_elo=False, publish=True):
+    """Weekly snapshot of problem counts into the history, see daily_update for publish"""
+    journal = RunJournal("leetcode-weekly-elo" if with_elo else "leetcode-weekly", "weekly")
+    if journal.output is not None:
+        return finish_run(journal, journal.output, publish)
 
-def weekly_update(existing_users):
+    user_stats, failed_users = fetch_user_stats(
+        existing_users, include_rating=with_elo, journal=journal
+    )
+    poll_state = load_poll_state()
+    today = datetime.now().strftime("%Y-%m-%d")
+    points = []
     valid_users = []
     for user in existing_users:
         username = user["name"]
-        print("Getting problem count of...", username)
-        problems_solved_count = get_problems_solved(username)
-        if problems_solved_count is not None:
+        stats = user_stats.get(username)
+        if username in failed_users:
+            # A transient failure is not a missing user, keep last known data
+            print(f"Keeping previous data for {username}, fetch failed")
+            valid_users.append(user)
+        elif stats is not None:
+            problems_solved_count = stats["problems_solved"]
+            if with_elo:
+                update_user_elo(user, stats["rating"])
+            # The weekly run polls everyone, which resets every dormant user's backoff
+            mark_polled(poll_state, username)
             print("COUNT WAS", problems_solved_count)
-            if user.get("problems_each_week", []):
-                user["problems_each_week"].append({
-                    "date": datetime.now().strftime("%Y-%m-%d"),
-                    "count": user.get("current_problem_count", 0)
-                })
-            else:
-                user["problems_each_week"] = [{
-                    "date": datetime.now().strftime("%Y-%m-%d"),
-                    "count": user.get("current_problem_count", 0)
-                }]
+            points.append(
+                add_weekly_point("problems", user, user.get("current_problem_count", 0), today)
+            )
 
             user["prev_problem_count"] = user.get(
                 "current_problem_count", problems_solved_count
@@ -165,24 +190,28 @@ def weekly_update(existing_users):
             )
             print("Problems solved by user...", problems_solved_count)
             valid_users.append(user)
-    update_json("../leetcode-elo/public/users_by_elo.json", valid_users)
-
+    log_weekly_points("problems", valid_users, points)
+    save_poll_state(poll_state)
+    return finish_run(journal, valid_users, publish)
 
-def main(weekly_or_daily):
-    # Get registered users from KV
-    registered_users = get_users_list()
-    print(f"Found {len(registered_users)} registered users")
 
+def prepare_users(registered_users):
+    """Existing LeetCode records from KV plus fresh records for newly registered users"""
     # Load existing LeetCode data from KV
     existing_data = load_existing_elos()
 
+    # Usernames LeetCode doesn't know (see import_registrations) aren't queried
+    quarantined = {name.casefold() for name in get_quarantine()}
+    if quarantined:
+        print(f"Skipping {len(quarantined)} quarantined usernames")
+
     # Create mapping of username to data
-    data_map = {user['name']: user for user in existing_data}
+    data_map = {user['name']: user for user in existing_data if user['name'].casefold() not in quarantined}
 
     # Initialize new users who don't have data yet
     for reg_user in registered_users:
         username = reg_user['leetcode_username']
-        if username not in data_map:
+        if username not in data_map and username.casefold() not in quarantined:
             print(f"Initializing new user: {username}")
             data_map[username] = {
                 'name': username,
@@ -192,25 +221,36 @@ def main(weekly_or_daily):
                 'prev_problem_count': 0,
                 'current_problem_delta': 0,
                 'problems_each_week': [],
-                'current_problem_count': 0
+                'current_problem_count': 0,
+                SCHEMA_VERSION_FIELD: current_version('leetcode')
             }
 
     # Convert map back to list
-    existing_users = list(data_map.values())
+    return list(data_map.values())
+
+
+def main(weekly_or_daily, with_elo=False, sweep=False):
+    # Get registered users from KV
+    registered_users = get_users_list()
+    print(f"Found {len(registered_users)} registered users")
+    existing_users = prepare_users(registered_users)
 
     if weekly_or_daily == "weekly":
-        weekly_update(existing_users)
+        weekly_update(existing_users, with_elo)
     elif weekly_or_daily == "daily":
-        daily_update(existing_users)
+        daily_update(existing_users, with_elo, sweep=sweep)
     else:
-        print("Usage: python script.py <weekly|daily>")
+        print("Usage: python script.py <weekly|daily> [--with-elo] [--sweep]")
 
     print("finished..")
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python script.py <weekly or daily>")
+        print("Usage: python script.py <weekly or daily> [--with-elo] [--sweep]")
     else:
         choice = sys.argv[1]
-        main(choice)
+        # --with-elo also refreshes contest ratings from the same requests,
+        # replacing a separate query_users_elo_daily.py pass
+        # --sweep makes a daily run poll dormant users too
+        main(choice, with_elo="--with-elo" in sys.argv[2:], sweep="--sweep" in sys.argv[2:])
@@ -0,0 +1,204 @@
+import os
+import time
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import http_transport
+from http_transport import TransientHTTPError
+
+load_dotenv()
+GITHUB_TOKEN = os.getenv('GITHUB-PAT')
+GITHUB_API_URL = "https://api.github.com/graphql"
+
+# Users per aliased query. contributionsCollection is expensive to compute on
+# GitHub's side, so large batches risk timing out rather than costing points.
+GITHUB_BATCH_SIZE = int(os.getenv("GITHUB_BATCH_SIZE", 10))
+# GitHub asks clients not to hammer GraphQL concurrently (secondary rate limits)
+GITHUB_CONCURRENCY = int(os.getenv("GITHUB_CONCURRENCY", 2))
+# Points never spent, so other jobs sharing the token keep some budget
+GITHUB_POINTS_RESERVE = int(os.getenv("GITHUB_POINTS_RESERVE", 50))
+# Below this share of the hourly limit, requests are spread out until the reset
+GITHUB_PACE_BELOW = float(os.getenv("GITHUB_PACE_BELOW", 0.2))
+
+headers = {
+    "Authorization": f"Bearer {GITHUB_TOKEN}",
+    "Content-Type": "application/json"
+}
+
+CALENDAR_FIELDS = """
+                weeks {
+                  contributionDays {
+                    contributionCount
+                    date
+                  }
+                }"""
+
+
+class RateLimitBudget:
+    """
+    Tracks GitHub's GraphQL point budget from the rateLimit field of each
+    response. Before a request, wait() pauses until the window resets when the
+    budget would drop below the reserve, and paces requests once it runs low.
+    """
+
+    def __init__(self, reserve=GITHUB_POINTS_RESERVE, pace_below=GITHUB_PACE_BELOW):
+        self.reserve = reserve
+        self.pace_below = pace_below
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.last_cost = 1
+        self.points_spent = 0
+        self.requests = 0
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def update(self, rate_limit):
+        """Record the rateLimit of a response ({cost, remaining, resetAt, limit})"""
+        if not rate_limit:
+            return
+        reset_at = datetime.fromisoformat(rate_limit["resetAt"].replace("Z", "+00:00"))
+        with self.lock:
+            self.requests += 1
+            self.points_spent += rate_limit["cost"]
+            self.last_cost = max(1, rate_limit["cost"])
+            self.limit = rate_limit.get("limit", self.limit)
+            # Concurrent responses can arrive out of order, keep the lowest count of the window
+            if self.reset_at != reset_at or self.remaining is None:
+                self.remaining = rate_limit["remaining"]
+            else:
+                self.remaining = min(self.remaining, rate_limit["remaining"])
+            self.reset_at = reset_at
+
+    def exhausted(self):
+        """Mark the budget as spent, e.g. after a RATE_LIMITED error"""
+        with self.lock:
+            self.remaining = 0
+
+    def delay(self):
+        """Seconds to wait before the next request"""
+        with self.lock:
+            if self.remaining is None or self.reset_at is None:
+                return 0.0
+            until_reset = (self.reset_at - datetime.now(timezone.utc)).total_seconds()
+            if until_reset <= 0:
+                return 0.0
+            spendable = self.remaining - self.reserve
+            if spendable < self.last_cost:
+                return until_reset + 1
+            if self.limit and self.remaining < self.limit * self.pace_below:
+                # Spread what is left evenly over the rest of the window
+                return until_reset / (spendable / self.last_cost)
+            return 0.0
+
+    def wait(self):
+        delay = self.delay()
+        if delay > 0:
+            if delay > 60:
+                print(f"GitHub point budget low ({self.remaining} left), pausing {delay:.0f}s until reset")
+            with self.lock:
+                self.waited += delay
+            time.sleep(delay)
+
+    def print_stats(self, label="GitHub GraphQL"):
+        print(
+            f"{label}: {self.requests} requests, {self.points_spent} points spent, "
+            f"{self.remaining} of {self.limit} left, waited {self.waited:.0f}s for the budget"
+        )
+
+
+def build_batched_query(usernames, since=None, to=None):
+    """
+    One payload aliasing user(login:) as c0, c1, ... per username, plus rateLimit.
+    since maps a username to the datetime its window starts at; users without
+    one get the full year and totalContributions.
+    """
+    since = since or {}
+    to = to or datetime.now(timezone.utc)
+    variable_defs = [f"$u{i}: String!" for i in range(len(usernames))]
+    variables = {f"u{i}": username for i, username in enumerate(usernames)}
+    fields = ""
+    for i, username in enumerate(usernames):
+        if since.get(username) is None:
+            collection = "contributionsCollection"
+            total = """
+                totalContributions"""
+        else:
+            collection = f"contributionsCollection(from: $f{i}, to: $to)"
+            total = ""
+            variable_defs.append(f"$f{i}: DateTime!")
+            variables[f"f{i}"] = since[username].strftime("%Y-%m-%dT00:00:00Z")
+        fields += f"""
+          c{i}: user(login: $u{i}) {{
+            {collection} {{
+              contributionCalendar {{{total}{CALENDAR_FIELDS}
+              }}
+            }}
+          }}"""
+    if any(since.get(username) is not None for username in usernames):
+        variable_defs.append("$to: DateTime!")
+        variables["to"] = to.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "query": f"""
+        query({", ".join(variable_defs)}) {{
+          rateLimit {{
+            cost
+            remaining
+            resetAt
+            limit
+          }}{fields}
+        }}
+        """,
+        "variables": variables,
+    }
+
+
+def split_batched_response(usernames, data):
+    """
+    Map a batched response back to {username: contributions or None}. Full
+    fetches come back as {total_contributions, calendar_data}, windowed ones as
+    {calendar_data}. Unknown users are null aliases (plus a NOT_FOUND error).
+    """
+    results = {}
+    aliases = (data or {}).get("data") or {}
+    for i, username in enumerate(usernames):
+        user = aliases.get(f"c{i}")
+        if not user:
+            print(f"User {username} does not exist on GitHub")
+            results[username] = None
+            continue
+        calendar = user["contributionsCollection"]["contributionCalendar"]
+        contributions = {"calendar_data": calendar["weeks"]}
+        if "totalContributions" in calendar:
+            contributions["total_contributions"] = calendar["totalContributions"]
+        results[username] = contributions
+    return results
+
+
+def get_contributions_batch(usernames, budget, since=None):
+    """
+    Fetch contributions of several users with one aliased GraphQL request.
+    Any failed request (rate limiting, a spent budget, a bad token) raises
+    TransientHTTPError so the whole batch keeps its previous data; only users
+    GitHub reports as missing come back as None.
+    """
+    budget.wait()
+    payload = build_batched_query(usernames, since)
+    response = http_transport.post(GITHUB_API_URL, headers=headers, json=payload)
+    if response.status_code == 403:
+        raise TransientHTTPError(f"GitHub rate limited the batch starting at {usernames[0]}")
+    if response.status_code != 200:
+        raise TransientHTTPError(
+            f"GitHub request for batch starting at {usernames[0]} failed: {response.status_code} {response.text[:200]}"
+        )
+
+    data = response.json()
+    budget.update((data.get("data") or {}).get("rateLimit"))
+    errors = data.get("errors") or []
+    if any(error.get("type") == "RATE_LIMITED" for error in errors):
+        budget.exhausted()
+        raise TransientHTTPError(f"GitHub point budget spent at batch starting at {usernames[0]}")
+    if data.get("data") is None:
+        # Query-level failure (usually a timeout computing the calendars), not missing users
+        raise TransientHTTPError(f"GitHub query for batch starting at {usernames[0]} failed: {errors}")
+    return split_batched_response(usernames, data)
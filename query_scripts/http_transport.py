@@ -0,0 +1,160 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Status codes worth retrying: rate limited or a server-side hiccup
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 4))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+
+# Per-host rate limits as "host=rate[:burst]" pairs, rate in requests/second,
+# e.g. HTTP_RATE_LIMITS="leetcode.com=4:8,api.github.com=10"
+DEFAULT_RATE_LIMITS = "leetcode.com=4:8,lccn.lbao.site=4:8"
+
+
+class TransientHTTPError(Exception):
+    """Raised when a request still fails after all retries (429, 5xx or a network error)"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_sessions = {}
+_buckets = {}
+_lock = threading.Lock()
+
+
+def parse_rate_limits(spec):
+    """Parse "host=rate[:burst],..." into {host: (rate, burst)}"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, value = entry.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[host.strip()] = (float(rate), float(burst) if burst else None)
+    return limits
+
+
+def configure_rate_limit(host, rate, burst=None):
+    """Set (or with rate=None, remove) the token bucket used for a host"""
+    with _lock:
+        if rate is None:
+            _buckets.pop(host, None)
+        else:
+            _buckets[host] = TokenBucket(rate, burst)
+
+
+for _host, (_rate, _burst) in parse_rate_limits(
+    os.getenv("HTTP_RATE_LIMITS", DEFAULT_RATE_LIMITS)
+).items():
+    configure_rate_limit(_host, _rate, _burst)
+
+
+def get_session(host):
+    """Keep-alive session for a host, shared by every thread"""
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, if any"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt, response=None):
+    """Exponential backoff with full jitter, honouring Retry-After when present"""
+    retry_after = _retry_after(response)
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, **kwargs):
+    """
+    Send a request through the pooled session for the URL's host.
+    Retries 429/5xx responses and connection errors; raises TransientHTTPError
+    once MAX_RETRIES is exhausted. Other responses are returned as-is.
+    """
+    host = urlsplit(url).hostname
+    session = get_session(host)
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+
+    for attempt in range(MAX_RETRIES + 1):
+        bucket = _buckets.get(host)
+        if bucket is not None:
+            bucket.acquire()
+
+        response = None
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            error = f"HTTP {response.status_code}"
+
+        if attempt == MAX_RETRIES:
+            break
+        delay = backoff_delay(attempt, response)
+        print(f"{method} {host} failed ({error}), retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+    raise TransientHTTPError(f"{method} {url} failed after {MAX_RETRIES + 1} attempts: {error}")
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,256 @@
+import os
+import csv
+import sys
+import uuid
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+
+from kv_client import get_users_list, put_kv, get_leetcode_data, get_quarantine, put_quarantine
+from leetcode_client import check_usernames_batch
+from fetch_engine import fetch_all, print_run_stats
+from json_stream import batched
+
+# Bulk registration: reads a CSV export of the sign-up form or a text file of
+# usernames, drops everyone already on the roster, checks the rest exist on
+# LeetCode and appends them to users:list the way RegisterForm does.
+# Usernames LeetCode doesn't know are kept in users:quarantine, which later
+# imports and the daily runs skip instead of asking LeetCode about them again.
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 20))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", 4))
+
+# Header names a form export may use for each field, compared lowercased
+CSV_COLUMNS = {
+    "leetcode_username": ("leetcode_username", "leetcode username", "leetcode", "username"),
+    "github_username": ("github_username", "github username", "github"),
+    "display_name": ("display_name", "display name", "name"),
+}
+# Otherwise a header mentioning this word, e.g. a Google Form's "What is your leetcode username"
+CSV_KEYWORDS = {"leetcode_username": "leetcode", "github_username": "github"}
+
+PROFILE_PREFIXES = ("https://leetcode.com/u/", "https://leetcode.com/", "leetcode.com/u/", "leetcode.com/")
+
+
+def normalize_username(value):
+    """A bare username from what people type into forms: '@name', profile URLs, stray spaces"""
+    value = (value or "").strip()
+    for prefix in PROFILE_PREFIXES:
+        if value.lower().startswith(prefix):
+            value = value[len(prefix):]
+            break
+    return value.strip("/").lstrip("@").strip()
+
+
+def username_key(username):
+    # LeetCode and GitHub usernames are case-insensitive
+    return username.casefold()
+
+
+def _csv_column(fieldnames, field):
+    headers = {name.strip().lower(): name for name in fieldnames or []}
+    for alias in CSV_COLUMNS[field]:
+        if alias in headers:
+            return headers[alias]
+    keyword = CSV_KEYWORDS.get(field)
+    if keyword:
+        for header, name in headers.items():
+            if keyword in header:
+                return name
+    return None
+
+
+def iter_registrations(filename):
+    """
+    Yield {"leetcode_username", "github_username", "display_name"} one row at a time.
+    .csv files are read by header; anything else is a text file with one
+    "leetcode[,github[,display name]]" per line, blank and # lines ignored.
+    """
+    with open(filename, "r", encoding="utf-8-sig", newline="") as f:
+        if filename.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            columns = {field: _csv_column(reader.fieldnames, field) for field in CSV_COLUMNS}
+            if columns["leetcode_username"] is None:
+                raise ValueError(f"{filename} has no LeetCode username column, headers: {reader.fieldnames}")
+            rows = ({field: row.get(column) if column else None for field, column in columns.items()} for row in reader)
+        else:
+            lines = (line for line in f if line.strip() and not line.lstrip().startswith("#"))
+            rows = (dict(zip(CSV_COLUMNS, row)) for row in csv.reader(lines))
+
+        for row in rows:
+            leetcode_username = normalize_username(row.get("leetcode_username"))
+            yield {
+                "leetcode_username": leetcode_username,
+                "github_username": normalize_username(row.get("github_username")),
+                "display_name": (row.get("display_name") or "").strip() or leetcode_username,
+            }
+
+
+def validate_usernames(usernames, batch_size=IMPORT_BATCH_SIZE, concurrency=IMPORT_CONCURRENCY):
+    """
+    {username: True (exists), False (not on LeetCode) or None (batch failed)},
+    checked in aliased batches with several batches in flight.
+    """
+    batches = list(batched(usernames, max(1, batch_size)))
+    print(f"Checking {len(usernames)} usernames in {len(batches)} batches...")
+    results, stats = fetch_all(batches, check_usernames_batch, concurrency)
+    print_run_stats(stats, "Username check")
+
+    found = {}
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            print(f"Batch starting at {batch[0]} failed: {result}")
+            found.update(dict.fromkeys(batch))
+        else:
+            found.update(result)
+    return found
+
+
+def new_registration(registration):
+    """A users:list entry shaped like the ones RegisterForm writes"""
+    return {
+        "id": str(uuid.uuid4()),
+        "leetcode_username": registration["leetcode_username"],
+        "github_username": registration["github_username"],
+        "display_name": registration["display_name"],
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+    }
+
+
+def quarantine_entry(reason, source):
+    return {
+        "reason": reason,
+        "source": source,
+        "rejected_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def import_registrations(filename, dry_run=False, batch_size=IMPORT_BATCH_SIZE, concurrency=IMPORT_CONCURRENCY):
+    """Import the registrations of a CSV or text file, returns a Counter of what happened to each row"""
+    registered = get_users_list()
+    quarantine = get_quarantine()
+    # Set lookups keep the dedupe O(1) per row however large the roster gets
+    known_leetcode = {username_key(user["leetcode_username"]) for user in registered}
+    known_leetcode.update(username_key(user["name"]) for user in get_leetcode_data())
+    known_github = {username_key(user["github_username"]) for user in registered if user.get("github_username")}
+    quarantined = {username_key(name) for name in quarantine}
+
+    outcome = Counter()
+    seen = set()
+    candidates = []
+    for registration in iter_registrations(filename):
+        key = username_key(registration["leetcode_username"])
+        github_key = username_key(registration["github_username"])
+        if not key:
+            outcome["blank"] += 1
+        elif key in seen:
+            outcome["duplicate in file"] += 1
+        elif key in known_leetcode:
+            outcome["already registered"] += 1
+        elif key in quarantined:
+            outcome["quarantined"] += 1
+        elif github_key and github_key in known_github:
+            outcome["GitHub username taken"] += 1
+        else:
+            seen.add(key)
+            if github_key:
+                known_github.add(github_key)
+            candidates.append(registration)
+
+    found = validate_usernames([c["leetcode_username"] for c in candidates], batch_size, concurrency)
+    accepted = []
+    source = os.path.basename(filename)
+    for registration in candidates:
+        username = registration["leetcode_username"]
+        if found.get(username) is None:
+            outcome["unverified"] += 1
+            print(f"Could not check {username}, run the import again to retry it")
+        elif found[username]:
+            accepted.append(new_registration(registration))
+        else:
+            outcome["rejected"] += 1
+            print(f"User {username} does not exist, quarantining...")
+            quarantine[username] = quarantine_entry("LeetCode user not found", source)
+    outcome["added"] = len(accepted)
+
+    if dry_run:
+        print("Dry run, nothing written")
+    else:
+        if outcome["rejected"] and not put_quarantine(quarantine):
+            print("Failed to save users:quarantine")
+        if accepted and not append_registrations(accepted):
+            outcome["added"] = 0
+    print_outcome(outcome)
+    return outcome
+
+
+def append_registrations(accepted):
+    """Append to users:list, re-read right before the write so sign-ups made during the import are kept"""
+    registered = get_users_list()
+    keys = {username_key(user["leetcode_username"]) for user in registered}
+    registered.extend(user for user in accepted if username_key(user["leetcode_username"]) not in keys)
+    if not put_kv("users:list", registered):
+        print("Failed to save users:list")
+        return False
+    print(f"Registered {len(accepted)} users, {len(registered)} in total")
+    return True
+
+
+def recheck_roster(dry_run=False, batch_size=IMPORT_BATCH_SIZE, concurrency=IMPORT_CONCURRENCY):
+    """Check every registered LeetCode username and quarantine the ones that no longer exist"""
+    quarantine = get_quarantine()
+    quarantined = {username_key(name) for name in quarantine}
+    usernames = [
+        user["leetcode_username"] for user in get_users_list()
+        if username_key(user["leetcode_username"]) not in quarantined
+    ]
+    found = validate_usernames(usernames, batch_size, concurrency)
+    missing = [username for username in usernames if found.get(username) is False]
+    for username in missing:
+        print(f"User {username} does not exist, quarantining...")
+        quarantine[username] = quarantine_entry("LeetCode user not found", "roster recheck")
+    print(f"{len(missing)} of {len(usernames)} registered usernames no longer exist")
+    if missing and not dry_run and not put_quarantine(quarantine):
+        print("Failed to save users:quarantine")
+    return missing
+
+
+def release(usernames):
+    """Take usernames out of quarantine, e.g. after someone fixed a typo in their profile"""
+    quarantine = get_quarantine()
+    keys = {username_key(username) for username in usernames}
+    released = [name for name in quarantine if username_key(name) in keys]
+    for name in released:
+        del quarantine[name]
+    if released and not put_quarantine(quarantine):
+        print("Failed to save users:quarantine")
+        return []
+    print(f"Released {', '.join(released) or 'nobody'} from quarantine")
+    return released
+
+
+def print_outcome(outcome):
+    print("\nImport summary")
+    for reason in ("added", "already registered", "duplicate in file", "GitHub username taken",
+                   "quarantined", "rejected", "unverified", "blank"):
+        if outcome[reason]:
+            print(f"  {reason:22} {outcome[reason]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import registrations into users:list")
+    parser.add_argument("file", nargs="?", help="sign-up form CSV export, or a text file with one username per line")
+    parser.add_argument("--dry-run", action="store_true", help="check and report without writing to KV")
+    parser.add_argument("--recheck", action="store_true", help="quarantine registered usernames that no longer exist")
+    parser.add_argument("--release", nargs="+", metavar="USERNAME", help="take usernames out of quarantine")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.release:
+        release(args.release)
+    elif args.recheck:
+        recheck_roster(args.dry_run, args.batch_size)
+    elif args.file:
+        import_registrations(args.file, args.dry_run, args.batch_size)
+    else:
+        parser.print_usage()
+        sys.exit(1)
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import tempfile
+from itertools import islice
+
+# User files can be stored either as the JSON array the site has always used
+# (json.dump(users, f, indent=4)) or as NDJSON, one compact user object per
+# line. NDJSON is picked by extension (.ndjson / .jsonl) and can be read and
+# written one user at a time, so a pass over the roster keeps one user (or one
+# batch) in memory instead of the whole file.
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+
+def is_ndjson(filename):
+    return filename.endswith(NDJSON_EXTENSIONS)
+
+
+def iter_users(filename):
+    """Yield the records of a user file, streaming when it is NDJSON"""
+    with open(filename, "r", encoding="utf-8") as f:
+        if is_ndjson(filename):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            # The array format has to be parsed whole
+            yield from json.load(f)
+
+
+def load_users(filename):
+    return list(iter_users(filename))
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array one item at a time, byte-for-byte like json.dump(items, f, indent=indent).
+    Output goes to a temp file that replaces the target on close.
+    """
+
+    def __init__(self, filename, indent=None):
+        self.filename = filename
+        self.indent = indent
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self.file = os.fdopen(fd, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, item):
+        if self.indent is None:
+            self.file.write(("[" if self.count == 0 else ", ") + json.dumps(item))
+        else:
+            pad = " " * self.indent
+            encoded = json.dumps(item, indent=self.indent).replace("\n", "\n" + pad)
+            self.file.write(("[\n" if self.count == 0 else ",\n") + pad + encoded)
+        self.count += 1
+
+    def close(self):
+        if self.count == 0:
+            self.file.write("[]")
+        else:
+            self.file.write("]" if self.indent is None else "\n]")
+        self.file.close()
+        os.replace(self.tmp_path, self.filename)
+
+    def discard(self):
+        """Drop the partial output and leave the target untouched"""
+        self.file.close()
+        os.unlink(self.tmp_path)
+
+
+class NdjsonWriter(JsonArrayWriter):
+    """Writes one compact JSON object per line, same temp file and replace-on-close as JsonArrayWriter"""
+
+    def write(self, item):
+        self.file.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.filename)
+
+
+def user_writer(filename, indent=4):
+    return NdjsonWriter(filename) if is_ndjson(filename) else JsonArrayWriter(filename, indent)
+
+
+def write_users(filename, users, indent=4):
+    """
+    Write an iterable of users in the format the filename's extension asks for.
+    Users are consumed one at a time and the file is only replaced once all of
+    them are written, so users may be a generator reading the same file.
+    Returns the number of users written.
+    """
+    writer = user_writer(filename, indent)
+    try:
+        for user in users:
+            writer.write(user)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+    return writer.count
+
+
+def batched(iterable, size):
+    """Lists of up to size items, for fetching a stream of users in batches"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def convert(source, target, indent=4):
+    """Rewrite a user file in the target's format; array -> NDJSON -> array is byte-identical"""
+    return write_users(target, iter_users(source), indent)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("Usage: python json_stream.py convert <source.json|.ndjson> <target.json|.ndjson>")
+        sys.exit(1)
+    count = convert(sys.argv[2], sys.argv[3])
+    print(f"Converted {count} users from {sys.argv[2]} to {sys.argv[3]}")
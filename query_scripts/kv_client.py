@@ -1,35 +1,118 @@
 import os
-import requests
 import json
+import time
+import hashlib
+import tempfile
 from dotenv import load_dotenv
+import http_transport
+from http_transport import TransientHTTPError
+from fetch_engine import fetch_all
+from calendar_codec import encode_user, decode_user
+from schema_migrations import upgrade_records
 
 load_dotenv()
 
 # Use the Worker URL as the bridge to KV
 WORKER_URL = os.getenv('WORKER_URL', 'https://weathered-dream-8f83.rayjones2170.workers.dev')
 
+# Number of KV requests in flight for the bulk helpers
+KV_CONCURRENCY = int(os.getenv('KV_CONCURRENCY', 8))
+
+# On-disk read-through cache of raw KV values, set KV_CACHE_DIR="" to disable.
+# Entries are revalidated with If-None-Match; the Worker answers 304 when the
+# sha256 of the stored value (sent back as its ETag) still matches. Entries
+# younger than KV_CACHE_MAX_AGE seconds are served without asking at all.
+KV_CACHE_DIR = os.getenv('KV_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.kv_cache'))
+KV_CACHE_MAX_AGE = float(os.getenv('KV_CACHE_MAX_AGE', 0))
+
+# The per-user sharded layout (see below) costs one KV request per user each
+# way, and the frontend still reads the "<prefix>:data" blob, so it is opt-in
+# until the Worker can serve shards in bulk. Set KV_SHARDED=1 to use it.
+KV_SHARDED = os.getenv('KV_SHARDED', '') == '1'
+
+def value_version(value_str):
+    """Version tag of a raw KV value, matches the ETag the Worker reports"""
+    return hashlib.sha256(value_str.encode('utf-8')).hexdigest()
+
+def _cache_path(key):
+    return os.path.join(KV_CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+def read_cache(key):
+    """Cached {'key', 'version', 'value', 'stored_at'} entry for a key, or None"""
+    if not KV_CACHE_DIR:
+        return None
+    try:
+        with open(_cache_path(key), 'r') as f:
+            entry = json.load(f)
+        return entry if entry.get('key') == key else None
+    except (OSError, ValueError):
+        return None
+
+def write_cache(key, value_str, version=None):
+    """Atomically store a raw KV value in the cache"""
+    if not KV_CACHE_DIR:
+        return
+    entry = {
+        'key': key,
+        'version': version or (value_version(value_str) if value_str is not None else None),
+        'value': value_str,
+        'stored_at': time.time()
+    }
+    try:
+        os.makedirs(KV_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=KV_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, _cache_path(key))
+    except OSError as e:
+        print(f"Could not cache KV {key}: {e}")
+
+def parse_kv_value(value):
+    """Turn a raw Worker value into Python data"""
+    # Worker returns {value: "..."}, parse if it's a JSON string
+    if value is None or value == 'null':
+        return None
+
+    # Try to parse as JSON if it's a string
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return value
+
+def _strip_etag(etag):
+    if not etag:
+        return None
+    return etag.removeprefix('W/').strip('"')
+
 def get_kv(key):
-    """Get value from KV store via Worker"""
-    url = f"{WORKER_URL}?key={key}"
+    """Get value from KV store via Worker, served from the local cache when unchanged"""
+    cached = read_cache(key)
+    if cached and time.time() - cached.get('stored_at', 0) < KV_CACHE_MAX_AGE:
+        return parse_kv_value(cached['value'])
 
     try:
-        response = requests.get(url)
+        headers = {}
+        if cached and cached.get('version'):
+            headers['If-None-Match'] = f'"{cached["version"]}"'
+        # Let requests encode the key, shard keys contain usernames
+        response = http_transport.get(WORKER_URL, params={'key': key}, headers=headers)
 
-        if response.status_code == 200:
+        if response.status_code == 304 and cached:
+            write_cache(key, cached['value'], cached['version'])
+            return parse_kv_value(cached['value'])
+        elif response.status_code == 200:
             data = response.json()
-            # Worker returns {value: "..."}, parse if it's a JSON string
-            if data.get('value') is None or data.get('value') == 'null':
-                return None
-
-            # Try to parse as JSON if it's a string
-            try:
-                return json.loads(data['value'])
-            except (json.JSONDecodeError, TypeError):
-                return data['value']
+            version = _strip_etag(response.headers.get('ETag')) or data.get('version')
+            write_cache(key, data.get('value'), version)
+            return parse_kv_value(data.get('value'))
         else:
             print(f"Error getting KV {key}: {response.status_code}")
             print(f"Response: {response.text}")
             return None
+    except TransientHTTPError:
+        # Don't turn an unreachable Worker into "no data", callers would
+        # otherwise publish an empty or truncated leaderboard
+        raise
     except Exception as e:
         print(f"Exception getting KV {key}: {e}")
         return None
@@ -37,8 +120,8 @@ def get_kv(key):
 def put_kv(key, value):
     """Put value to KV store via Worker"""
     try:
-        # Convert value to JSON string if it's a dict or list
-        if isinstance(value, (dict, list)):
+        # Convert value to JSON string if it's a dict or list (None becomes "null")
+        if value is None or isinstance(value, (dict, list)):
             value_str = json.dumps(value)
         else:
             value_str = str(value)
@@ -48,9 +131,11 @@ def put_kv(key, value):
             'value': value_str
         }
 
-        response = requests.post(WORKER_URL, json=payload)
+        response = http_transport.post(WORKER_URL, json=payload)
 
         if response.status_code == 200:
+            # Later reads in this run or the next one can revalidate against this
+            write_cache(key, value_str, _strip_etag(response.headers.get('ETag')))
             return True
         else:
             print(f"Error putting KV {key}: {response.status_code} - {response.text}")
@@ -59,25 +144,160 @@ def put_kv(key, value):
         print(f"Exception putting KV {key}: {e}")
         return False
 
+def get_kv_many(keys):
+    """Get several KV values concurrently, returns {key: value}"""
+    keys = list(keys)
+    values, _ = fetch_all(keys, get_kv, KV_CONCURRENCY)
+    for key, value in zip(keys, values):
+        if isinstance(value, Exception):
+            raise value
+    return dict(zip(keys, values))
+
+def put_kv_many(items):
+    """Put several {key: value} pairs concurrently, returns the keys that failed"""
+    items = list(items.items())
+    results, _ = fetch_all(items, lambda item: put_kv(*item), KV_CONCURRENCY)
+    return {key for (key, _), ok in zip(items, results) if ok is not True}
+
+# Sharded layout: "<prefix>:user:<name>" holds one record and "<prefix>:index"
+# holds the record order plus a content hash per record, so a run only has to
+# write the records whose hash changed.
+
+def shard_key(prefix, name):
+    return f"{prefix}:user:{name}"
+
+def index_key(prefix):
+    return f"{prefix}:index"
+
+def record_hash(record):
+    """Stable content hash of a record"""
+    encoded = json.dumps(record, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def get_sharded(prefix):
+    """Read every record of a sharded prefix in index order, None if it isn't sharded yet"""
+    index = get_kv(index_key(prefix))
+    if not index:
+        return None
+
+    names = index.get('users', [])
+    values = get_kv_many(shard_key(prefix, name) for name in names)
+    records = []
+    for name in names:
+        record = values.get(shard_key(prefix, name))
+        if record is None:
+            print(f"Missing shard for {name} under {prefix}, skipping...")
+            continue
+        records.append(record)
+    return records
+
+def put_sharded(prefix, records, key_field):
+    """
+    Write only the records that changed since the last run, then the index.
+    Returns the number of records written, or None if some writes failed.
+    """
+    index = get_kv(index_key(prefix)) or {}
+    old_hashes = index.get('hashes', {})
+
+    names = []
+    hashes = {}
+    changed = {}
+    for record in records:
+        name = record[key_field]
+        names.append(name)
+        hashes[name] = record_hash(record)
+        if old_hashes.get(name) != hashes[name]:
+            changed[shard_key(prefix, name)] = record
+
+    # Clear shards of users that are no longer in the data
+    for name in set(old_hashes) - set(hashes):
+        changed[shard_key(prefix, name)] = None
+
+    failed = put_kv_many(changed)
+    for name in names:
+        if shard_key(prefix, name) in failed:
+            # Keep the old hash so the record is written again next run
+            if name in old_hashes:
+                hashes[name] = old_hashes[name]
+            else:
+                hashes.pop(name)
+    names = [name for name in names if name in hashes]
+
+    if changed or names != index.get('users'):
+        put_kv(index_key(prefix), {'users': names, 'hashes': hashes})
+
+    print(f"{prefix}: wrote {len(changed) - len(failed)} of {len(records)} records ({len(failed)} failed)")
+    return None if failed else len(changed)
+
 def get_users_list():
     """Get registered users from KV"""
     users = get_kv('users:list')
     return users if users else []
 
-def get_leetcode_data():
-    """Get LeetCode data from KV"""
-    data = get_kv('leetcode:data')
-    return data if data else []
+def get_quarantine():
+    """Rejected LeetCode usernames from KV, {username: {"reason", "rejected_at"}}"""
+    quarantine = get_kv('users:quarantine')
+    return quarantine if quarantine else {}
+
+def put_quarantine(quarantine):
+    return put_kv('users:quarantine', quarantine)
+
+def put_blob(prefix, data):
+    """
+    Write the single "<prefix>:data" blob, unless it is identical to the
+    value read (or written) earlier, which the cache knows the version of
+    """
+    key = f'{prefix}:data'
+    cached = read_cache(key)
+    if cached and cached.get('version') == value_version(json.dumps(data)):
+        print(f"{prefix}: no changes, skipping {key}")
+        return True
+    return put_kv(key, data)
+
+def publish_sharded(prefix, key_field, data):
+    """
+    Write changed records to the sharded layout, then refresh the single
+    "<prefix>:data" blob the frontend reads, but only when something changed.
+    """
+    written = put_sharded(prefix, data, key_field)
+    if written == 0:
+        print(f"{prefix}: no changes, skipping {prefix}:data")
+        return True
+    return put_kv(f'{prefix}:data', data) and written is not None
+
+def get_leetcode_data(upgrade=True):
+    """Get LeetCode data from KV, upgraded to the current schema unless upgrade is False"""
+    data = get_sharded('leetcode') if KV_SHARDED else None
+    if data is None:
+        # Not migrated to the sharded layout yet
+        data = get_kv('leetcode:data')
+    if not data:
+        return []
+    return list(upgrade_records('leetcode', data)) if upgrade else data
 
 def put_leetcode_data(data):
     """Save LeetCode data to KV"""
-    return put_kv('leetcode:data', data)
+    if KV_SHARDED:
+        return publish_sharded('leetcode', 'name', data)
+    return put_blob('leetcode', data)
 
-def get_github_data():
-    """Get GitHub data from KV"""
-    data = get_kv('github:data')
-    return data if data else []
+def get_github_data(upgrade=True):
+    """
+    Get GitHub data from KV, with calendar_data unpacked to GitHub's weeks
+    layout and upgraded to the current schema unless upgrade is False
+    """
+    data = get_sharded('github') if KV_SHARDED else None
+    if data is None:
+        # Not migrated to the sharded layout yet
+        data = get_kv('github:data')
+    if not data:
+        return []
+    data = [decode_user(user) for user in data]
+    return list(upgrade_records('github', data)) if upgrade else data
 
 def put_github_data(data):
-    """Save GitHub data to KV"""
-    return put_kv('github:data', data)
+    """Save GitHub data to KV, with calendar_data packed (see calendar_codec)"""
+    data = [encode_user(user) for user in data]
+    if KV_SHARDED:
+        return publish_sharded('github', 'github_username', data)
+    return put_blob('github', data)
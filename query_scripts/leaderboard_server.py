@@ -0,0 +1,254 @@
+import os
+import sys
+import gzip
+import json
+import asyncio
+import hashlib
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+import http_transport
+from calendar_codec import encode_user
+from json_stream import load_users
+
+# Read API for the leaderboards. The update scripts publish each finished run
+# into it (POST /publish/<board>), and it keeps every board pre-sorted,
+# pre-serialized and pre-gzipped in memory:
+#   GET /leaderboards/<board>                      whole board, sorted like the frontend sorts it
+#   GET /leaderboards/<board>?page=2&page_size=50  {"total", "page", "page_size", "users"}
+#   GET /leaderboards/<board>?q=ray                matches on name / display name, paged the same way
+#   GET /health                                    record count and version of every board
+# Every response carries an ETag; a matching If-None-Match gets an empty 304.
+LEADERBOARD_HOST = os.getenv("LEADERBOARD_HOST", "127.0.0.1")
+LEADERBOARD_PORT = int(os.getenv("LEADERBOARD_PORT", 8790))
+# Where the scripts publish to; publishing is skipped when unset
+LEADERBOARD_SERVER_URL = os.getenv("LEADERBOARD_SERVER_URL", "")
+# Bearer token required by /publish when set
+LEADERBOARD_PUBLISH_TOKEN = os.getenv("LEADERBOARD_PUBLISH_TOKEN", "")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rendered pages and searches kept per board version
+PAGE_CACHE_SIZE = 256
+
+# board: (sort field, highest first, and the fields search matches on)
+BOARDS = {
+    "leetcode": ("current_problem_delta", ("name", "display_name")),
+    "github": ("contribution_delta", ("github_username", "display_name")),
+}
+
+STATUS_TEXT = {200: "OK", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+               401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+MAX_BODY = 64 * 1024 * 1024
+
+
+class Rendered:
+    """Response body in plain and gzip form, with their ETags"""
+
+    def __init__(self, body):
+        self.body = body
+        self.gzip_body = gzip.compress(body, 6)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+
+
+class Leaderboard:
+    """One published board: records sorted and serialized once, pages rendered on first use"""
+
+    def __init__(self, name, records):
+        sort_field, search_fields = BOARDS[name]
+        if name == "github":
+            # Ship calendars packed, the frontend's decodeGithubUsers unpacks them
+            records = [encode_user(record) for record in records]
+        records = sorted(records, key=lambda record: -(record.get(sort_field) or 0))
+        self.name = name
+        self.encoded = [json.dumps(record, separators=(",", ":")).encode("utf-8") for record in records]
+        self.search_keys = [
+            " ".join(str(record.get(field) or "") for field in search_fields).lower()
+            for record in records
+        ]
+        self.full = Rendered(b"[" + b",".join(self.encoded) + b"]")
+        self.version = self.full.etag.strip('"')
+        self.pages = OrderedDict()
+
+    def __len__(self):
+        return len(self.encoded)
+
+    def page(self, page, page_size, query=""):
+        """Rendered {"total", "page", "page_size", "users"} for a page of the (searched) board"""
+        cache_key = (page, page_size, query)
+        rendered = self.pages.get(cache_key)
+        if rendered is not None:
+            self.pages.move_to_end(cache_key)
+            return rendered
+
+        indexes = range(len(self.encoded))
+        if query:
+            indexes = [i for i, key in enumerate(self.search_keys) if query in key]
+        start = (page - 1) * page_size
+        users = b",".join(self.encoded[i] for i in indexes[start:start + page_size])
+        head = json.dumps({"total": len(indexes), "page": page, "page_size": page_size})
+        rendered = Rendered(head[:-1].encode("utf-8") + b',"users":[' + users + b"]}")
+
+        self.pages[cache_key] = rendered
+        if len(self.pages) > PAGE_CACHE_SIZE:
+            self.pages.popitem(last=False)
+        return rendered
+
+
+class LeaderboardServer:
+    def __init__(self, boards=None, publish_token=LEADERBOARD_PUBLISH_TOKEN):
+        self.boards = boards or {}
+        self.publish_token = publish_token
+
+    def publish(self, name, records):
+        self.install(Leaderboard(name, records))
+
+    def install(self, board):
+        # Readers holding the old board finish with it, new requests see this one
+        self.boards[board.name] = board
+        print(f"Published {board.name}: {len(board)} records, version {board.version}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self.respond(writer, headers, 413, b'{"error":"body too large"}')
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(method, target, headers, body)
+                await self.respond(writer, headers, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        if method == "OPTIONS":
+            return 204, b""
+        if parts == ["health"]:
+            health = {name: {"records": len(board), "version": board.version} for name, board in self.boards.items()}
+            return 200, json.dumps(health).encode("utf-8")
+        if len(parts) == 2 and parts[0] == "leaderboards" and method == "GET":
+            return self.read(parts[1], parse_qs(url.query))
+        if len(parts) == 2 and parts[0] == "publish" and method == "POST":
+            if self.publish_token and headers.get("authorization") != f"Bearer {self.publish_token}":
+                return 401, b'{"error":"unauthorized"}'
+            if parts[1] not in BOARDS:
+                return 404, b'{"error":"unknown board"}'
+            try:
+                records = json.loads(body)
+            except ValueError:
+                return 400, b'{"error":"body must be a JSON array of records"}'
+            # Sorting and rendering a large board shouldn't stall the readers
+            board = await asyncio.get_running_loop().run_in_executor(None, Leaderboard, parts[1], records)
+            self.install(board)
+            return 200, json.dumps({"version": board.version}).encode("utf-8")
+        return 404, b'{"error":"not found"}'
+
+    def read(self, name, params):
+        board = self.boards.get(name)
+        if board is None:
+            return 404, b'{"error":"unknown board"}'
+        if not params:
+            return 200, board.full
+        try:
+            page = max(1, int(params.get("page", ["1"])[0]))
+            page_size = min(MAX_PAGE_SIZE, max(1, int(params.get("page_size", [DEFAULT_PAGE_SIZE])[0])))
+        except ValueError:
+            return 400, b'{"error":"page and page_size must be integers"}'
+        query = params.get("q", [""])[0].strip().lower()
+        return 200, board.page(page, page_size, query)
+
+    async def respond(self, writer, request_headers, status, payload):
+        headers = {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "If-None-Match, Content-Type, Authorization",
+            "Access-Control-Expose-Headers": "ETag",
+            "Content-Type": "application/json",
+        }
+        body = payload
+        if isinstance(payload, Rendered):
+            use_gzip = "gzip" in request_headers.get("accept-encoding", "")
+            etag = payload.gzip_etag if use_gzip else payload.etag
+            headers["ETag"] = etag
+            headers["Vary"] = "Accept-Encoding"
+            headers["Cache-Control"] = "no-cache"
+            if etag in (tag.strip() for tag in request_headers.get("if-none-match", "").split(",")):
+                status, body = 304, b""
+            elif use_gzip:
+                headers["Content-Encoding"] = "gzip"
+                body = payload.gzip_body
+            else:
+                body = payload.body
+        headers["Content-Length"] = str(len(body))
+
+        head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1"))
+        writer.write(body)
+        await writer.drain()
+
+    async def serve(self, host=LEADERBOARD_HOST, port=LEADERBOARD_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {', '.join(self.boards) or 'no boards yet'} on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def publish_leaderboard(name, records):
+    """Push a finished run into the read server; a no-op unless LEADERBOARD_SERVER_URL is set"""
+    if not LEADERBOARD_SERVER_URL:
+        return None
+    headers = {"Authorization": f"Bearer {LEADERBOARD_PUBLISH_TOKEN}"} if LEADERBOARD_PUBLISH_TOKEN else {}
+    try:
+        response = http_transport.post(f"{LEADERBOARD_SERVER_URL}/publish/{name}", json=records, headers=headers)
+    except Exception as e:
+        print(f"Could not publish {name} to the read server: {e}")
+        return False
+    if response.status_code != 200:
+        print(f"Could not publish {name} to the read server: {response.status_code} {response.text}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the leaderboards from memory")
+    parser.add_argument("--host", default=LEADERBOARD_HOST)
+    parser.add_argument("--port", type=int, default=LEADERBOARD_PORT)
+    parser.add_argument("--from-kv", action="store_true", help="load the current boards from KV at startup")
+    parser.add_argument("--leetcode", help="load the leetcode board from a .json/.ndjson user file")
+    parser.add_argument("--github", help="load the github board from a .json/.ndjson user file")
+    args = parser.parse_args()
+
+    server = LeaderboardServer()
+    if args.from_kv:
+        from kv_client import get_leetcode_data, get_github_data
+        server.publish("leetcode", get_leetcode_data())
+        server.publish("github", get_github_data())
+    for name in BOARDS:
+        filename = getattr(args, name)
+        if filename:
+            server.publish(name, load_users(filename))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,172 @@
+import http_transport
+from http_transport import TransientHTTPError
+from cookies import cookies
+
+GRAPHQL_URL = "https://leetcode.com/graphql"
+
+headers = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Upgrade-Insecure-Requests": "1",
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0",
+}
+
+CONTEST_RATING_QUERY = """
+query userContestRankingInfo($username: String!) {
+    userContestRanking(username: $username) {
+        rating
+    }
+}
+"""
+
+SUBMIT_STATS_FIELDS = """{
+                submitStatsGlobal {
+                    acSubmissionNum {
+                        difficulty
+                        count
+                    }
+                }
+            }"""
+
+
+def post_graphql(payload):
+    """POST a GraphQL payload to LeetCode with the shared headers and cookies"""
+    return http_transport.post(GRAPHQL_URL, headers=headers, cookies=cookies, json=payload)
+
+
+def total_solved(matched_user):
+    """Pull the "All" accepted count out of a matchedUser object"""
+    counts = matched_user["submitStatsGlobal"]["acSubmissionNum"]
+    return next(
+        (entry["count"] for entry in counts if entry["difficulty"] == "All"),
+        counts[0]["count"],
+    )
+
+
+def contest_rating(ranking):
+    """Rating from a userContestRanking object, 0 for users who never entered a contest"""
+    if ranking is None:
+        return 0
+    return ranking["rating"]
+
+
+def get_elo_of_leetcoder(username):
+    payload = {
+        "operationName": "userContestRankingInfo",
+        "query": CONTEST_RATING_QUERY,
+        "variables": {"username": username},
+    }
+    response = post_graphql(payload)
+    if response.status_code == 200:
+        data = response.json()
+        return contest_rating((data.get("data") or {}).get("userContestRanking"))
+    else:
+        print(
+            "Failed to retrieve data for {}: {}".format(username, response.status_code)
+        )
+        return None
+
+
+def build_batched_query(usernames, include_rating=False):
+    """
+    Build a single payload that aliases matchedUser (p0, p1, ...) and, when
+    include_rating is set, userContestRanking (r0, r1, ...) once per username.
+    Only acSubmissionNum and rating are selected.
+    """
+    variable_defs = ", ".join(f"$u{i}: String!" for i in range(len(usernames)))
+    fields = ""
+    for i in range(len(usernames)):
+        fields += f"""
+            p{i}: matchedUser(username: $u{i}) {SUBMIT_STATS_FIELDS}"""
+        if include_rating:
+            fields += f"""
+            r{i}: userContestRanking(username: $u{i}) {{
+                rating
+            }}"""
+    return {
+        "operationName": "batchedUserStats",
+        "query": f"""
+        query batchedUserStats({variable_defs}) {{{fields}
+        }}
+        """,
+        "variables": {f"u{i}": username for i, username in enumerate(usernames)},
+    }
+
+
+def split_batched_response(usernames, data, include_rating=False):
+    """
+    Map a batched response back to {username: stats or None}. Unknown usernames
+    come back as null aliases (plus an entry in "errors"), which only affects
+    that user's entry. A response without any data is a failed batch, not K
+    missing users, and raises TransientHTTPError.
+    """
+    results = {}
+    aliases = (data or {}).get("data")
+    if not aliases:
+        errors = (data or {}).get("errors")
+        raise TransientHTTPError(f"Batch starting at {usernames[0]} returned no data: {errors}")
+    for i, username in enumerate(usernames):
+        matched_user = aliases.get(f"p{i}")
+        if not matched_user:
+            print(f"User {username} does not exist, skipping...")
+            results[username] = None
+            continue
+        stats = {"problems_solved": total_solved(matched_user)}
+        if include_rating:
+            stats["rating"] = contest_rating(aliases.get(f"r{i}"))
+        results[username] = stats
+    return results
+
+
+def get_user_stats_batch(usernames, include_rating=False):
+    """Fetch stats for several users with one aliased GraphQL request"""
+    payload = build_batched_query(usernames, include_rating)
+    response = post_graphql(payload)
+    if response.status_code != 200:
+        # Raised so the batch counts as failed and its users keep their data
+        raise TransientHTTPError(
+            f"Failed to retrieve stats for batch starting at {usernames[0]}: {response.status_code}"
+        )
+    return split_batched_response(usernames, response.json(), include_rating)
+
+
+def build_exists_query(usernames):
+    """One aliased payload (e0, e1, ...) asking only whether each username exists"""
+    variable_defs = ", ".join(f"$u{i}: String!" for i in range(len(usernames)))
+    fields = "".join(
+        f"""
+            e{i}: matchedUser(username: $u{i}) {{
+                username
+            }}"""
+        for i in range(len(usernames))
+    )
+    return {
+        "operationName": "usernamesExist",
+        "query": f"""
+        query usernamesExist({variable_defs}) {{{fields}
+        }}
+        """,
+        "variables": {f"u{i}": username for i, username in enumerate(usernames)},
+    }
+
+
+def check_usernames_batch(usernames):
+    """
+    {username: True/False} for whether each username exists, in one request.
+    A failed request raises TransientHTTPError instead of reporting everyone
+    as missing, so callers never reject a username because of an outage.
+    """
+    response = post_graphql(build_exists_query(usernames))
+    if response.status_code != 200:
+        raise TransientHTTPError(
+            f"Username check for batch starting at {usernames[0]} failed: {response.status_code}"
+        )
+    aliases = response.json().get("data") or {}
+    if not aliases:
+        raise TransientHTTPError(f"Username check for batch starting at {usernames[0]} returned no data")
+    return {username: aliases.get(f"e{i}") is not None for i, username in enumerate(usernames)}
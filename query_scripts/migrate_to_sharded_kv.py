@@ -0,0 +1,21 @@
+from kv_client import get_kv, get_sharded, put_sharded
+
+# Split the single-blob keys into one key per user plus an index key.
+# Safe to re-run: records whose hash already matches the index are skipped,
+# and the <prefix>:data blobs are left in place for the frontend.
+# The update scripts only read and write the shards when KV_SHARDED=1.
+for prefix, key_field in [('leetcode', 'name'), ('github', 'github_username')]:
+    print(f"\nMigrating {prefix}:data to sharded keys...")
+    data = get_kv(f'{prefix}:data') or []
+    written = put_sharded(prefix, data, key_field)
+    if written is None:
+        print(f"✗ Some {prefix} records failed to write, re-run to retry")
+        continue
+
+    sharded = get_sharded(prefix) or []
+    if sharded != data:
+        print(f"✗ {prefix} read-back mismatch: {len(sharded)} sharded vs {len(data)} in blob")
+    else:
+        print(f"✓ Migrated {len(data)} {prefix} users ({written} written)")
+
+print("\n✅ Migration complete!")
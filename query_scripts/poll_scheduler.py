@@ -0,0 +1,94 @@
+import os
+import math
+from datetime import datetime
+from kv_client import get_kv, put_kv
+
+# Daily runs only poll users who are due: active users every run, dormant
+# users on a backoff of 2^(flat weeks) days capped at POLL_MAX_INTERVAL_DAYS.
+# Weekly runs poll everyone, so nobody is more than a week stale.
+POLL_MAX_INTERVAL_DAYS = int(os.getenv("POLL_MAX_INTERVAL_DAYS", 7))
+# Weekly points used for the activity slope
+SLOPE_WEEKS = int(os.getenv("POLL_SLOPE_WEEKS", 4))
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# When each user was last polled, {username: timestamp}. It lives in its own
+# KV key, not in the published records, so polling a user whose counts didn't
+# move leaves their record (and the leetcode:data blob or their shard) as is.
+POLL_STATE_KEY = "leetcode:poll_state"
+
+
+def load_poll_state():
+    return get_kv(POLL_STATE_KEY) or {}
+
+
+def save_poll_state(state):
+    if not put_kv(POLL_STATE_KEY, state):
+        print(f"Failed to save {POLL_STATE_KEY}, the next daily run may poll more users than needed")
+
+
+def weekly_counts(user):
+    """problems_each_week as plain counts, from either {date, count} points or bare ints"""
+    return [
+        point["count"] if isinstance(point, dict) else point
+        for point in user.get("problems_each_week") or []
+    ]
+
+
+def activity_score(user):
+    """Problems per week lately: this week's delta or the recent weekly slope, whichever is higher"""
+    counts = weekly_counts(user)[-SLOPE_WEEKS:]
+    slope = (counts[-1] - counts[0]) / (len(counts) - 1) if len(counts) > 1 else 0.0
+    return max(user.get("current_problem_delta") or 0, slope)
+
+
+def flat_weeks(user):
+    """Number of trailing weekly points without a change"""
+    counts = weekly_counts(user)
+    weeks = 0
+    for previous, current in zip(reversed(counts[:-1]), reversed(counts)):
+        if current != previous:
+            break
+        weeks += 1
+    return weeks
+
+
+def poll_interval_days(user):
+    if activity_score(user) > 0:
+        return 1
+    return min(POLL_MAX_INTERVAL_DAYS, 2 ** flat_weeks(user))
+
+
+def is_due(user, state, now=None):
+    """Whether a daily run should poll this user; never-polled users always are"""
+    if not state.get(user["name"]):
+        return True
+    try:
+        last_polled = datetime.strptime(state[user["name"]], TIMESTAMP_FORMAT)
+    except ValueError:
+        return True
+    now = now or datetime.now()
+    # Whole days, so a run that starts a little earlier than yesterday's still counts
+    return (now.date() - last_polled.date()).days >= poll_interval_days(user)
+
+
+def select_due(users, state, now=None):
+    """Split users into (due, skipped) for a daily run, given the poll state"""
+    due, skipped = [], []
+    for user in users:
+        (due if is_due(user, state, now) else skipped).append(user)
+    return due, skipped
+
+
+def mark_polled(state, username, now=None):
+    state[username] = (now or datetime.now()).strftime(TIMESTAMP_FORMAT)
+
+
+def print_schedule_summary(due, skipped, batch_size=1):
+    """How many users and requests a run skipped"""
+    total = len(due) + len(skipped)
+    saved = math.ceil(total / batch_size) - math.ceil(len(due) / batch_size)
+    print(
+        f"Polling {len(due)} of {total} users, skipped {len(skipped)} dormant users "
+        f"({saved} requests saved)"
+    )
@@ -0,0 +1,183 @@
+import os
+import re
+import sys
+import json
+import argparse
+from array import array
+from bisect import bisect_left, bisect_right
+
+CATEGORIES_FILE = "leetcode-problem-analysis/leetcode_problems_with_categories.json"
+SHARDS_DIR = "../leetcode-elo/public/catalog"
+
+# Columns kept per problem, in the order shards list them
+COLUMNS = ["ID", "Rating", "Title", "TitleZH", "TitleSlug", "ContestSlug", "ProblemIndex"]
+
+
+def topic_slug(topic):
+    return re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")
+
+
+class ProblemCatalog:
+    """
+    Problems in a struct-of-arrays layout sorted by Rating. Topics are interned
+    to bit positions so each problem's topics are a single int bitmask, and
+    rating ranges are found with bisect instead of scanning every problem.
+    """
+
+    def __init__(self, records):
+        records = sorted(records, key=lambda record: float(record["Rating"]))
+
+        self.topics = sorted({topic for record in records for topic in record.get("Topics", [])})
+        self.topic_bits = {topic: 1 << i for i, topic in enumerate(self.topics)}
+
+        self.ratings = array("d", (float(record["Rating"]) for record in records))
+        self.ids = array("l", (int(record["ID"]) for record in records))
+        self.titles = [record["Title"] for record in records]
+        self.titles_zh = [record.get("TitleZH", "") for record in records]
+        self.slugs = [record["TitleSlug"] for record in records]
+        self.contest_slugs = [record.get("ContestSlug", "") for record in records]
+        self.problem_indexes = [record.get("ProblemIndex", "") for record in records]
+        self.topic_masks = [self.mask(record.get("Topics", [])) for record in records]
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def mask(self, topics):
+        """Bitmask of topic names; unknown topics raise KeyError"""
+        mask = 0
+        for topic in topics:
+            mask |= self.topic_bits[topic]
+        return mask
+
+    def topics_of(self, mask):
+        return [topic for topic in self.topics if mask & self.topic_bits[topic]]
+
+    def row(self, i):
+        """Problem i as a record like the source JSON"""
+        return {
+            "ID": self.ids[i],
+            "Rating": self.ratings[i],
+            "Title": self.titles[i],
+            "TitleZH": self.titles_zh[i],
+            "TitleSlug": self.slugs[i],
+            "ContestSlug": self.contest_slugs[i],
+            "ProblemIndex": self.problem_indexes[i],
+            "Topics": self.topics_of(self.topic_masks[i]),
+        }
+
+    def rating_range(self, min_rating=None, max_rating=None):
+        """Index range [lo, hi) of problems with min_rating <= Rating <= max_rating"""
+        lo = 0 if min_rating is None else bisect_left(self.ratings, min_rating)
+        hi = len(self.ratings) if max_rating is None else bisect_right(self.ratings, max_rating)
+        return lo, max(lo, hi)
+
+    def matching(self, all_topics=(), any_topics=(), min_rating=None, max_rating=None):
+        """Indexes (ascending rating) having every topic in all_topics and, if given, one of any_topics"""
+        required = self.mask(all_topics)
+        optional = self.mask(any_topics)
+        lo, hi = self.rating_range(min_rating, max_rating)
+        masks = self.topic_masks
+        return [
+            i for i in range(lo, hi)
+            if masks[i] & required == required and (not optional or masks[i] & optional)
+        ]
+
+    def query(self, all_topics=(), any_topics=(), min_rating=None, max_rating=None,
+              page=1, page_size=50, descending=False):
+        """One page of matching problems plus the total match count"""
+        indexes = self.matching(all_topics, any_topics, min_rating, max_rating)
+        if descending:
+            indexes.reverse()
+        start = (max(1, page) - 1) * page_size
+        return {
+            "total": len(indexes),
+            "page": page,
+            "page_size": page_size,
+            "problems": [self.row(i) for i in indexes[start:start + page_size]],
+        }
+
+    def export_shards(self, out_dir=SHARDS_DIR, band_width=200):
+        """
+        Write one columnar JSON file per topic and rating band
+        (<topic-slug>/<band start>.json) plus an index.json manifest, so a
+        client can fetch only the topic/band it is showing.
+        """
+        manifest = {"columns": COLUMNS + ["Topics"], "band_width": band_width, "topics": {}}
+        for topic in self.topics:
+            bit = self.topic_bits[topic]
+            slug = topic_slug(topic)
+            bands = {}
+            for i, mask in enumerate(self.topic_masks):
+                if mask & bit:
+                    band = int(self.ratings[i] // band_width) * band_width
+                    bands.setdefault(band, []).append(i)
+
+            os.makedirs(os.path.join(out_dir, slug), exist_ok=True)
+            for band, indexes in bands.items():
+                shard = {
+                    "topic": topic,
+                    "band": [band, band + band_width],
+                    "rows": [
+                        [self.ids[i], self.ratings[i], self.titles[i], self.titles_zh[i],
+                         self.slugs[i], self.contest_slugs[i], self.problem_indexes[i],
+                         self.topics_of(self.topic_masks[i])]
+                        for i in indexes
+                    ],
+                }
+                with open(os.path.join(out_dir, slug, f"{band}.json"), "w") as f:
+                    json.dump(shard, f, ensure_ascii=False, separators=(",", ":"))
+            manifest["topics"][topic] = {
+                "slug": slug,
+                "bands": {str(band): len(indexes) for band, indexes in sorted(bands.items())},
+            }
+
+        with open(os.path.join(out_dir, "index.json"), "w") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+
+def load_catalog(filename=CATEGORIES_FILE):
+    with open(filename, "r") as f:
+        return ProblemCatalog(json.load(f))
+
+
+def parse_rating_range(value):
+    low, _, high = value.partition("-")
+    return (float(low) if low else None, float(high) if high else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or shard the problem catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = sub.add_parser("query")
+    query_parser.add_argument("--topics", default="", help="comma separated, all must match")
+    query_parser.add_argument("--any-topics", default="", help="comma separated, one must match")
+    query_parser.add_argument("--rating", default="", help="e.g. 1800-2100, 1800- or -2100")
+    query_parser.add_argument("--page", type=int, default=1)
+    query_parser.add_argument("--page-size", type=int, default=20)
+    query_parser.add_argument("--desc", action="store_true")
+
+    export_parser = sub.add_parser("export")
+    export_parser.add_argument("out_dir", nargs="?", default=SHARDS_DIR)
+    export_parser.add_argument("--band-width", type=int, default=200)
+
+    args = parser.parse_args()
+    catalog = load_catalog()
+
+    if args.command == "query":
+        min_rating, max_rating = parse_rating_range(args.rating)
+        split = lambda value: [topic.strip() for topic in value.split(",") if topic.strip()]
+        try:
+            result = catalog.query(split(args.topics), split(args.any_topics), min_rating, max_rating,
+                                   args.page, args.page_size, args.desc)
+        except KeyError as e:
+            print(f"Unknown topic {e}, known topics: {', '.join(catalog.topics)}")
+            sys.exit(1)
+        print(f"{result['total']} matches, page {result['page']}")
+        for problem in result["problems"]:
+            print(f"{problem['Rating']:8.1f}  {problem['ID']:>5}  {problem['Title']}  [{', '.join(problem['Topics'])}]")
+    else:
+        manifest = catalog.export_shards(args.out_dir, args.band_width)
+        shard_count = sum(len(topic["bands"]) for topic in manifest["topics"].values())
+        print(f"Wrote {shard_count} shards for {len(manifest['topics'])} topics to {args.out_dir}")
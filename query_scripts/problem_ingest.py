@@ -0,0 +1,161 @@
+import os
+import csv
+import sys
+import json
+import shutil
+from dataclasses import dataclass, field
+from fetch_problem_categories import load_known_topics
+from json_stream import JsonArrayWriter
+
+RATINGS_TSV = "leetcode-problem-analysis/ratings(1).txt"
+PROBLEM_DATA_FILE = "leetcode-problem-analysis/leetcode_problem_data.json"
+CATEGORIES_FILE = "leetcode-problem-analysis/leetcode_problems_with_categories.json"
+PUBLIC_CATEGORIES_FILE = "../leetcode-elo/public/problems_with_categories.json"
+PUBLIC_RATINGS_FILE = "../leetcode-elo/public/ratings.json"
+
+# Every spelling of a key across the sources, mapped to the Problem field
+KEY_ALIASES = {
+    "Rating": "rating",
+    "ID": "id",
+    "Title": "title",
+    "TitleZH": "title_zh", "Title ZH": "title_zh",
+    "TitleSlug": "title_slug", "Title Slug": "title_slug",
+    "ContestSlug": "contest_slug", "Contest Slug": "contest_slug",
+    "ProblemIndex": "problem_index", "Problem Index": "problem_index",
+    "ContestID_en": "contest_id_en",
+    "ContestID_zh": "contest_id_zh",
+    "Topics": "topics",
+}
+
+
+@dataclass
+class Problem:
+    """One problem merged from every source, keyed by id"""
+    id: int
+    rating: float = 0.0
+    title: str = ""
+    title_zh: str = ""
+    title_slug: str = ""
+    contest_slug: str = ""
+    problem_index: str = ""
+    contest_id_en: str = ""
+    contest_id_zh: str = ""
+    topics: list = field(default_factory=list)
+    # Rating exactly as the freshest source spelled it, so re-emitting doesn't reformat it
+    rating_text: str = ""
+
+    def merge(self, values):
+        """Fill in fields from a normalized source record; non-empty values win"""
+        for name, value in values.items():
+            if name == "id" or value in (None, "", []):
+                continue
+            if name == "rating":
+                self.rating_text = str(value)
+                value = float(value)
+            setattr(self, name, value)
+
+    # Artefact layouts
+
+    def problem_data(self):
+        """leetcode_problem_data.json layout"""
+        return {
+            "Rating": self.rating,
+            "ID": self.id,
+            "Title": self.title,
+            "TitleZH": self.title_zh,
+            "TitleSlug": self.title_slug,
+            "ContestSlug": self.contest_slug,
+            "ProblemIndex": self.problem_index,
+            "ContestID_en": self.contest_id_en,
+            "ContestID_zh": self.contest_id_zh,
+        }
+
+    def with_categories(self):
+        """leetcode_problems_with_categories.json / public/problems_with_categories.json layout"""
+        return {**self.problem_data(), "Topics": self.topics}
+
+    def public_rating(self):
+        """public/ratings.json layout: the TSV's key spellings with string values"""
+        return {
+            "Title ZH": self.title_zh,
+            "Rating": self.rating_text or repr(self.rating),
+            "Title Slug": self.title_slug,
+            "Problem Index": self.problem_index,
+            "ID": str(self.id),
+            "Title": self.title,
+            "Contest Slug": self.contest_slug,
+        }
+
+
+def normalize_record(record):
+    """Map a source record's keys onto Problem fields, dropping unknown keys"""
+    return {KEY_ALIASES[key]: value for key, value in record.items() if key in KEY_ALIASES}
+
+
+def read_tsv(filename):
+    """Stream a ratings TSV dump one normalized record at a time"""
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            yield normalize_record(row)
+
+
+def read_json(filename):
+    """Normalized records of a JSON array source (skipped if the file doesn't exist)"""
+    if not os.path.exists(filename):
+        return
+    with open(filename, "r", encoding="utf-8") as f:
+        for record in json.load(f):
+            yield normalize_record(record)
+
+
+def merge_sources(*sources):
+    """Merge normalized record streams by id; later sources override earlier ones"""
+    problems = {}
+    for source in sources:
+        for values in source:
+            problem_id = int(values["id"])
+            problems.setdefault(problem_id, Problem(problem_id)).merge(values)
+    return problems
+
+
+def ingest(tsv_file=RATINGS_TSV):
+    """
+    Merge the ratings TSV with the existing problem data and known topics, then
+    write every downstream artefact in a single pass over the merged problems.
+    """
+    known_topics = load_known_topics()
+    problems = merge_sources(
+        read_json(PUBLIC_RATINGS_FILE),
+        read_json(PROBLEM_DATA_FILE),
+        read_tsv(tsv_file),
+    )
+    print(f"Merged {len(problems)} problems from {tsv_file} and existing data")
+
+    writers = {
+        "problem_data": JsonArrayWriter(PROBLEM_DATA_FILE),
+        "categories": JsonArrayWriter(CATEGORIES_FILE, indent=2),
+        "public_ratings": JsonArrayWriter(PUBLIC_RATINGS_FILE, indent=4),
+    }
+    missing_topics = 0
+    for problem in sorted(problems.values(), key=lambda problem: -problem.rating):
+        writers["problem_data"].write(problem.problem_data())
+        if problem.title_slug in known_topics:
+            problem.topics = known_topics[problem.title_slug][0]
+            writers["categories"].write(problem.with_categories())
+        else:
+            missing_topics += 1
+        writers["public_ratings"].write(problem.public_rating())
+    for writer in writers.values():
+        writer.close()
+
+    # The frontend serves an exact copy of the categories file
+    shutil.copyfile(CATEGORIES_FILE, PUBLIC_CATEGORIES_FILE)
+
+    print(f"Wrote {writers['problem_data'].count} problems to {PROBLEM_DATA_FILE} and {PUBLIC_RATINGS_FILE}")
+    print(f"Wrote {writers['categories'].count} problems to {CATEGORIES_FILE} and {PUBLIC_CATEGORIES_FILE}")
+    if missing_topics:
+        print(f"{missing_topics} problems have no topics yet, run: python fetch_problem_categories.py --incremental")
+
+
+if __name__ == "__main__":
+    ingest(sys.argv[1] if len(sys.argv) > 1 else RATINGS_TSV)
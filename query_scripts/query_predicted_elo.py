@@ -1,6 +1,26 @@
-import requests
+import os
 import json
 import sys
+import math
+import time
+import http_transport
+from http_transport import TransientHTTPError
+from fetch_engine import fetch_all, print_run_stats
+from run_journal import atomic_write_json
+from json_stream import load_users, write_users
+from schema_migrations import upgrade_records
+
+CONTEST_RECORDS_URL = "https://lccn.lbao.site/api/v1/contest-records"
+# Records requested per page in bulk mode (the server may return fewer)
+PAGE_SIZE = int(os.getenv('CONTEST_RECORDS_PAGE_SIZE', 100))
+PREDICTION_CONCURRENCY = int(os.getenv('PREDICTION_CONCURRENCY', 8))
+USERS_FILE = '../leetcode-elo/public/users_by_elo.json'
+
+# Live contest mode: seconds between polls, minimum seconds between writes of
+# USERS_FILE, and a cap on how long to wait for the ratings to become final
+LIVE_POLL_INTERVAL = int(os.getenv('LIVE_POLL_INTERVAL', 60))
+LIVE_PUBLISH_INTERVAL = int(os.getenv('LIVE_PUBLISH_INTERVAL', 300))
+LIVE_MAX_HOURS = float(os.getenv('LIVE_MAX_HOURS', 12))
 
 headers = {
     'Accept': 'application/json',
@@ -9,9 +29,13 @@ headers = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0'
 }
 
-def get_new_rating_of_user(username, contest_name):
-    url = f"https://lccn.lbao.site/api/v1/contest-records/user?contest_name={contest_name}&username={username}&archived=false"
-    response = requests.get(url, headers=headers)
+def archived_param(archived):
+    # Archived records are LeetCode's final ratings, the others are predictions
+    return 'true' if archived else 'false'
+
+def get_new_rating_of_user(username, contest_name, archived=False):
+    url = f"https://lccn.lbao.site/api/v1/contest-records/user?contest_name={contest_name}&username={username}&archived={archived_param(archived)}"
+    response = http_transport.get(url, headers=headers)
     if response.status_code == 200:
         data = response.json()
         if data and isinstance(data, list) and len(data) > 0:
@@ -20,9 +44,118 @@ def get_new_rating_of_user(username, contest_name):
     print("No Data... They probably didn't take the contest...")
     return None
 
-def load_existing_elos(filename):
+def get_contest_record_count(contest_name, archived=False):
+    """Number of records (participants) of a contest"""
+    response = http_transport.get(
+        f"{CONTEST_RECORDS_URL}/count",
+        params={'contest_name': contest_name, 'archived': archived_param(archived)},
+        headers=headers
+    )
+    if response.status_code == 200:
+        return int(response.json())
+    print(f'Failed to retrieve record count of {contest_name}: {response.status_code}')
+    return None
+
+def get_contest_records_page(contest_name, skip, limit=PAGE_SIZE, archived=False):
+    """One page of a contest's records, ordered by rank"""
+    response = http_transport.get(
+        CONTEST_RECORDS_URL,
+        params={'contest_name': contest_name, 'archived': archived_param(archived), 'skip': skip, 'limit': limit},
+        headers=headers
+    )
+    if response.status_code == 200:
+        return response.json() or []
+    raise TransientHTTPError(f'Records page at {skip} of {contest_name} failed: {response.status_code}')
+
+def read_records_dump(filename):
+    """Stream records from a downloaded dump, either a JSON array or one record per line"""
     with open(filename, 'r') as file:
-        return json.load(file)
+        first = file.read(1)
+        file.seek(0)
+        if first == '[':
+            yield from json.load(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+def join_records(records, usernames):
+    """Hash join contest records against the roster, returns [(username, new_rating)]"""
+    # LeetCode usernames are case-insensitive, keep the roster's spelling
+    roster = {username.lower(): username for username in usernames}
+    user_ratings = []
+    for record in records:
+        username = roster.get(str(record.get('username', '')).lower())
+        if username is not None and record.get('new_rating') is not None:
+            user_ratings.append((username, int(record['new_rating'])))
+    return user_ratings
+
+def fetch_ratings_per_user(usernames, contest_name, archived=False, raise_on_failure=False):
+    """
+    One lookup per roster member, run concurrently. With raise_on_failure a
+    failed lookup raises TransientHTTPError instead of skipping that user, so
+    callers can tell a failed poll from one that found nobody.
+    """
+    results, stats = fetch_all(
+        usernames,
+        lambda username: get_new_rating_of_user(username, contest_name, archived),
+        PREDICTION_CONCURRENCY
+    )
+    print_run_stats(stats, "Per-user prediction fetch")
+    if raise_on_failure and stats["failed"]:
+        raise TransientHTTPError(f"{stats['failed']} of {len(usernames)} per-user lookups failed")
+    user_ratings = []
+    for username, new_rating in zip(usernames, results):
+        if isinstance(new_rating, Exception):
+            # User keeps their current elo, update_elos_with_new_ratings doesn't drop anyone
+            print(f"Skipping {username} for now: {new_rating}")
+        elif new_rating is not None:
+            user_ratings.append((username, int(new_rating)))
+    return user_ratings
+
+def fetch_ratings_bulk(usernames, contest_name, archived=False, raise_on_failure=False):
+    """
+    Page through the whole contest once and join it against the roster.
+    Falls back to per-user lookups when that would take more requests or the
+    records can't be read; see fetch_ratings_per_user for raise_on_failure.
+    """
+    try:
+        count = get_contest_record_count(contest_name, archived)
+        first_page = get_contest_records_page(contest_name, 0, archived=archived) if count is not None else None
+    except TransientHTTPError as e:
+        print(f"Contest records unavailable ({e}), using per-user lookups")
+        return fetch_ratings_per_user(usernames, contest_name, archived, raise_on_failure)
+    if count is None:
+        return fetch_ratings_per_user(usernames, contest_name, archived, raise_on_failure)
+
+    # The server may cap the page size below what we asked for
+    page_size = max(1, len(first_page))
+    pages = math.ceil(count / page_size)
+    if pages > len(usernames):
+        print(f"{count} records in {pages} pages > {len(usernames)} users, using per-user lookups")
+        return fetch_ratings_per_user(usernames, contest_name, archived, raise_on_failure)
+
+    print(f"Fetching {count} records of {contest_name} in {pages} pages...")
+    skips = list(range(page_size, count, page_size))
+    results, stats = fetch_all(
+        skips,
+        lambda skip: get_contest_records_page(contest_name, skip, page_size, archived),
+        PREDICTION_CONCURRENCY
+    )
+    print_run_stats(stats, "Contest records fetch")
+
+    failed = [skip for skip, result in zip(skips, results) if isinstance(result, Exception)]
+    if failed:
+        # Don't guess who is on the missing pages, ask for the roster directly
+        print(f"{len(failed)} pages failed, using per-user lookups")
+        return fetch_ratings_per_user(usernames, contest_name, archived, raise_on_failure)
+
+    records = first_page + [record for page in results for record in page]
+    return join_records(records, usernames)
+
+def load_existing_elos(filename):
+    """Users of a .json array or .ndjson file, upgraded to the current schema"""
+    return list(upgrade_records('leetcode', load_users(filename)))
 
 def update_elos_with_new_ratings(existing_elos, user_ratings):
     elo_dict = {user['name']: user for user in existing_elos}
@@ -33,26 +166,116 @@ def update_elos_with_new_ratings(existing_elos, user_ratings):
     return list(elo_dict.values())
 
 def write_elos_to_json(filename, updated_elos):
-    with open(filename, 'w') as file:
-        json.dump(updated_elos, file, indent=4)
+    write_users(filename, updated_elos)
+
+def ratings_are_final(contest_name):
+    """LeetCode has published the contest's real ratings once archived records exist"""
+    try:
+        return bool(get_contest_record_count(contest_name, archived=True))
+    except TransientHTTPError:
+        return False
+
+def changed_ratings(user_ratings, last_seen):
+    """Ratings that differ from the last poll's, and record them as seen"""
+    changes = {}
+    for username, new_rating in user_ratings:
+        if last_seen.get(username) != new_rating:
+            changes[username] = new_rating
+            last_seen[username] = new_rating
+    return changes
+
+def publish_live_changes(elo_dict, changes, published):
+    """
+    Apply changed ratings to the roster and write USERS_FILE once.
+    prev_elo is only moved the first time a user changes during the contest,
+    so it keeps their rating from before the contest across repeated updates.
+    """
+    for username, new_rating in changes.items():
+        user = elo_dict[username]
+        if username not in published:
+            user['prev_elo'] = user['elo']
+            published.add(username)
+        user['elo'] = new_rating
+    atomic_write_json(USERS_FILE, list(elo_dict.values()))
+    print(f"Published {len(changes)} changed ratings to {USERS_FILE}")
 
-def main(contest_name):
-    existing_elos = load_existing_elos('../leetcode-elo/public/users_by_elo.json')
+def live_contest(contest_name, poll_interval=LIVE_POLL_INTERVAL,
+                 publish_interval=LIVE_PUBLISH_INTERVAL, max_hours=LIVE_MAX_HOURS):
+    """
+    Poll predictions for the roster until the contest's ratings are final.
+    Only users whose new_rating changed since the previous poll are published,
+    and changes are collected for publish_interval seconds so a burst of
+    updates becomes a single write of USERS_FILE.
+    """
+    elo_dict = {user['name']: user for user in load_existing_elos(USERS_FILE)}
+    usernames = list(elo_dict)
+    last_seen = {}
+    pending = {}
+    published = set()
+    # The first poll's ratings go out right away, later ones are debounced
+    last_publish = float('-inf')
+    final = False
+    deadline = time.monotonic() + max_hours * 3600
+    polls = 0
+
+    try:
+        while True:
+            final = ratings_are_final(contest_name)
+            polls += 1
+            try:
+                user_ratings = fetch_ratings_bulk(usernames, contest_name, archived=final, raise_on_failure=True)
+            except TransientHTTPError as e:
+                print(f"Poll {polls} failed, retrying next interval: {e}")
+                user_ratings = None
+            if user_ratings is not None:
+                changes = changed_ratings(user_ratings, last_seen)
+                pending.update(changes)
+                print(f"Poll {polls}: {len(user_ratings)} ratings, {len(changes)} changed, {len(pending)} pending")
+
+            # A failed final poll is retried, the archived ratings are the ones to keep.
+            # A successful one ends the loop even if nobody on the roster took part.
+            if (final and user_ratings is not None) or time.monotonic() >= deadline:
+                break
+            if pending and time.monotonic() - last_publish >= publish_interval:
+                publish_live_changes(elo_dict, pending, published)
+                pending = {}
+                last_publish = time.monotonic()
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Stopping live mode...")
+
+    if pending:
+        publish_live_changes(elo_dict, pending, published)
+    if final:
+        print(f"Ratings of {contest_name} are final, {len(published)} users updated over {polls} polls")
+    else:
+        print(f"Stopped before {contest_name} was final, {len(published)} users updated over {polls} polls")
+
+def main(contest_name, mode='bulk', dump_file=None):
+    existing_elos = load_existing_elos(USERS_FILE)
     usernames = [user['name'] for user in existing_elos]
-    user_ratings = []
-    for username in usernames:
-        print("Getting delta rating of...", username)
-        new_rating = get_new_rating_of_user(username, contest_name)
-        if new_rating is not None:
-            new_rating = int(new_rating)
-            user_ratings.append((username, new_rating))
-            print("Success! Adding new rating", new_rating, "to", username)
+    if dump_file:
+        user_ratings = join_records(read_records_dump(dump_file), usernames)
+    elif mode == 'per-user':
+        user_ratings = fetch_ratings_per_user(usernames, contest_name)
+    else:
+        user_ratings = fetch_ratings_bulk(usernames, contest_name)
+    for username, new_rating in user_ratings:
+        print("Success! Adding new rating", new_rating, "to", username)
+    print(f"Found new ratings for {len(user_ratings)} of {len(usernames)} users")
     updated_elos = update_elos_with_new_ratings(existing_elos, user_ratings)
-    write_elos_to_json('../leetcode-elo/public/users_by_elo.json', updated_elos)
+    write_elos_to_json(USERS_FILE, updated_elos)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python script.py <contest_name>")
+        print("Usage: python script.py <contest_name> [--per-user] [--dump records.json] [--live]")
     else:
         contest_name = sys.argv[1]
-        main(contest_name)
+        if '--live' in sys.argv:
+            live_contest(contest_name)
+            sys.exit(0)
+        dump_file = None
+        if '--dump' in sys.argv:
+            dump_file = sys.argv[sys.argv.index('--dump') + 1]
+        mode = 'per-user' if '--per-user' in sys.argv else 'bulk'
+        main(contest_name, mode, dump_file)
@@ -1,94 +1,37 @@
-import requests
+import os
 import json
-from cookies import cookies
-# Define the headers and cookies as given in your template
-headers = {
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-    'Accept-Language': 'en-US,en;q=0.5',
-    'Connection': 'keep-alive',
-    'Sec-Fetch-Dest': 'document',
-    'Sec-Fetch-Mode': 'navigate',
-    'Sec-Fetch-Site': 'none',
-    'Sec-Fetch-User': '?1',
-    'Upgrade-Insecure-Requests': '1',
-    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0'
-}
-def get_problems_solved(username):
-    url = "https://leetcode.com/graphql"
-    payload = {
-        "operationName": "userProblemsSolved",
-        "query": """
-        query userProblemsSolved($username: String!) {
-            allQuestionsCount {
-                difficulty
-                count
-            }
-            matchedUser(username: $username) {
-                problemsSolvedBeatsStats {
-                    difficulty
-                    percentage
-                }
-                submitStatsGlobal {
-                    acSubmissionNum {
-                        difficulty
-                        count
-                    }
-                }
-            }
-        }
-        """,
-        "variables": {"username": username}
-    }
-    response = requests.post(url, headers=headers, cookies=cookies, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        total_problems_solved = data['data']['matchedUser']['submitStatsGlobal']['acSubmissionNum'][0]['count']
-        return total_problems_solved
-    else:
-        print(f'Failed to retrieve problem stats for {username}: {response.status_code}')
-        return None
+from http_transport import TransientHTTPError
+from leetcode_client import get_elo_of_leetcoder
+from run_journal import RunJournal
+from fetch_engine import fetch_all
+from json_stream import iter_users, load_users, write_users, batched
+from schema_migrations import SCHEMA_VERSION_FIELD, upgrade_records
 
-def get_elo_of_leetcoder(username):
-    url = "https://leetcode.com/graphql"
-    payload = {
-        "operationName": "userContestRankingInfo",
-        "query": """
-        query userContestRankingInfo($username: String!) {
-            userContestRanking(username: $username) {
-                rating
-            }
-        }
-        """,
-        "variables": {"username": username}
-    }
-    response = requests.post(url, headers=headers, cookies=cookies, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        if data['data']['userContestRanking'] == None:
-            return 0
-        return data['data']['userContestRanking']['rating']
-    else:
-        print('Failed to retrieve data for {}: {}'.format(username, response.status_code))
-        return None
+USERS_FILE = '../leetcode-elo/public/users_by_elo.json'
+# Users fetched concurrently per step of the streaming pipeline
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 50))
 
 def load_existing_elos(filename):
-    with open(filename, 'r') as file:
-        return json.load(file)
+    """Users of a .json array or .ndjson file, upgraded to the current schema"""
+    return list(upgrade_records('leetcode', load_users(filename)))
+
+def published_fields(user):
+    record = {
+        "name": user['name'],
+        "elo": user['elo'],
+        "prev_elo": user.get("prev_elo", 0),
+        'prev_problem_count': user.get('prev_problem_count',0),
+        'current_problem_delta': user.get('current_problem_delta', 0),
+        'problems_each_week': user.get("problems_each_week", []),
+        'current_problem_count': user['current_problem_count']
+    }
+    if SCHEMA_VERSION_FIELD in user:
+        record[SCHEMA_VERSION_FIELD] = user[SCHEMA_VERSION_FIELD]
+    return record
 
 def update_json(filename, users):
-    data = []
-    for user in users:
-        data.append({
-            "name": user['name'],
-            "elo": user['elo'],
-            "prev_elo": user.get("prev_elo", 0),
-            'prev_problem_count': user.get('prev_problem_count',0),
-            'current_problem_delta': user.get('current_problem_delta', 0),
-            'problems_each_week': user.get("problems_each_week", []),
-            'current_problem_count': user['current_problem_count']
-        })
-    with open(filename, 'w') as file:
-        json.dump(data, file, indent=4)
+    """Atomically write users (any iterable) as a .json array or .ndjson file"""
+    write_users(filename, (published_fields(user) for user in users))
 
 def read_usernames_from_file(filename):
     with open(filename, 'r') as file:
@@ -102,28 +45,77 @@ def write_elos_to_json(filename, user_elos):
     with open(filename, 'w') as file:
         json.dump(data, file, indent=4)
 
-def main():
-    existing_users = load_existing_elos('../leetcode-elo/public/users_by_elo.json')
-    print("Loaded object", existing_users)
-    # usernames = [user['name'] for user in existing_elos]
-    user_elos = []
-    for user in existing_users:
-        username = user["name"]
-        print("Getting elo of...", user["name"])
-        elo = int(get_elo_of_leetcoder(user["name"]))
-        if elo is not None:
-            if user.get("is_new_user",False):
-                user["prev_elo"] = user["elo"]
-                user["elo"] = elo
-            else:
-                user["elo"] = elo
-                user["prev_elo"] = elo
-                user["is_new_user"] = False
-            user_elos.append((username, elo))
-            print("Success! Adding value of elo", elo, "to", username)
-        # problems_solved_count = get_problems_solved(username)
-        # print("Problems solved by user...", problems_solved_count)
-    update_json('../leetcode-elo/public/users_by_elo.json', existing_users)
+def update_user_elo(user, elo):
+    """
+    Apply a freshly fetched contest rating to a user record. prev_elo only
+    moves when the rating changed, so "since last contest" on the leaderboard
+    survives runs between contests.
+    """
+    elo = int(elo)
+    old_elo = user.get("elo", 0)
+    if elo == old_elo:
+        return
+    # A first rating isn't a change since the last contest
+    user["prev_elo"] = old_elo if old_elo else elo
+    user["elo"] = elo
+    user["is_new_user"] = False
+
+def fetch_elo(username, journal):
+    """Journaled elo of a user; a transient failure returns False so the user keeps their elo"""
+    if username in journal:
+        return journal.get(username)
+    try:
+        elo = get_elo_of_leetcoder(username)
+    except TransientHTTPError as e:
+        print(f"Keeping previous elo for {username}: {e}")
+        return False
+    journal.record(username, elo)
+    return elo
+
+def updated_users(users, journal, batch_size=STREAM_BATCH_SIZE):
+    """
+    Generator pipeline: read a batch of users, fetch their elos concurrently,
+    update and yield them. Only one batch is held in memory at a time.
+    """
+    for batch in batched(users, batch_size):
+        print(f"Getting elo of {len(batch)} users, starting at {batch[0]['name']}...")
+        elos, _ = fetch_all([user["name"] for user in batch], lambda username: fetch_elo(username, journal))
+        for user, elo in zip(batch, elos):
+            if isinstance(elo, Exception):
+                print(f"Keeping previous elo for {user['name']}: {elo}")
+            elif elo is not None and elo is not False:
+                update_user_elo(user, elo)
+                print("Success! Adding value of elo", user["elo"], "to", user["name"])
+            yield user
+
+def staged_path(filename):
+    """users_by_elo.json -> users_by_elo.next.json, same format as the original"""
+    root, ext = os.path.splitext(filename)
+    return f"{root}.next{ext}"
+
+def main(filename=USERS_FILE):
+    journal = RunJournal("leetcode-elo-daily", "daily")
+    if journal.output is not None:
+        if isinstance(journal.output, str):
+            # Output was staged before the crash, publish it as-is
+            if os.path.exists(journal.output):
+                os.replace(journal.output, filename)
+        else:
+            update_json(filename, journal.output)
+        journal.complete()
+        print("Finished and saved all the Elo's")
+        return
+
+    # Stream users through the update into a staged file, then swap it in.
+    # The journal notes the staged file so a restart doesn't re-apply updates.
+    staged = staged_path(filename)
+    update_json(staged, updated_users(upgrade_records('leetcode', iter_users(filename)), journal))
+    journal.save_output(staged)
+    os.replace(staged, filename)
+    journal.complete()
     print("Finished and saved all the Elo's")
+
 if __name__ == "__main__":
-    main()
+    import sys
+    # Pass users_by_elo.ndjson to work on the NDJSON copy instead
+    main(*sys.argv[1:2])
@@ -0,0 +1,306 @@
+import sys
+import json
+import time
+import numpy as np
+from datetime import date
+from fetch_engine import fetch_all, print_run_stats
+from query_predicted_elo import (
+    CONTEST_RECORDS_URL,
+    PREDICTION_CONCURRENCY,
+    get_contest_record_count,
+    get_contest_records_page,
+    join_records,
+    load_existing_elos,
+    update_elos_with_new_ratings,
+    write_elos_to_json,
+)
+
+# Synthetic standings whose expected ratings come from predict_pairwise, only
+# a consistency check of the vectorized path
+SAMPLE_CONTEST_FILE = "sample_data/sample_contest.json"
+# A real contest: every participant's rank, old rating and contest count, plus
+# LeetCode's published new ratings for a slice of them (see fetch_reference).
+# None is checked in yet, so predict is still unverified against real ratings
+# until one is fetched and passed to verify.
+REFERENCE_CONTEST_FILE = "sample_data/reference_contest.json"
+# Published ratings the prediction has to land within. LeetCode rounds its
+# intermediate values and we only see the results, so exact agreement isn't
+# expected.
+REFERENCE_TOLERANCE = 2.0
+# Participants of the reference contest whose published ratings are kept
+REFERENCE_SLICE = 300
+USERS_FILE = "../leetcode-elo/public/users_by_elo.json"
+DELTA_FILE = "../leetcode-elo/public/predicted_rating_delta.json"
+
+# Rating of a participant without contest history
+DEFAULT_RATING = 1500.0
+# Expected seeds are tabulated on this integer rating grid, padded so the
+# performance search never runs off either end
+GRID_PADDING = 1600
+SELF_TERM_ITERATIONS = 4
+
+
+def win_probability(rating_diff):
+    """Elo probability that an opponent rated rating_diff below you beats you"""
+    return 1.0 / (1.0 + np.power(10.0, rating_diff / 400.0))
+
+
+def contest_weight(attended):
+    """LeetCode's f(k) = 1 / (1 + sum_{i=0..k} (5/7)^i) for k previously attended contests"""
+    attended = np.asarray(attended, dtype=float)
+    return 1.0 / (1.0 + (1.0 - np.power(5.0 / 7.0, attended + 1)) / (2.0 / 7.0))
+
+
+def expected_seed_table(ratings):
+    """
+    Expected rank (1 + expected number of participants beating you) for every
+    integer rating on a grid covering the field, against the whole field.
+    The ratings are histogrammed onto the grid and convolved with the win
+    probability kernel by FFT, O(G log G) for a grid of G points instead of
+    O(n^2) for n participants.
+    """
+    lo = int(np.floor(ratings.min())) - GRID_PADDING
+    hi = int(np.ceil(ratings.max())) + GRID_PADDING
+    grid = np.arange(lo, hi + 1, dtype=float)
+    size = len(grid)
+
+    # Linear split of each rating between its two neighbouring grid points
+    position = ratings - lo
+    below = np.floor(position).astype(int)
+    frac = position - below
+    hist = np.bincount(below, weights=1 - frac, minlength=size + 1)
+    hist += np.bincount(below + 1, weights=frac, minlength=size + 1)
+    hist = hist[:size]
+
+    # kernel[d + size - 1] = P(opponent beats a player rated d above them)
+    offsets = np.arange(-(size - 1), size, dtype=float)
+    kernel = win_probability(offsets)
+    n = len(kernel) + size - 1
+    fft_size = 1 << (n - 1).bit_length()
+    conv = np.fft.irfft(np.fft.rfft(hist, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)
+    return grid, 1.0 + conv[size - 1:2 * size - 1]
+
+
+def predict(old_ratings, ranks, attended):
+    """
+    Predicted new ratings for a whole contest, vectorized:
+      seed  = expected rank from the prior ratings (self excluded)
+      m     = sqrt(seed * actual rank)
+      perf  = rating whose expected rank is m
+      new   = old + (perf - old) * f(attended contests)
+    """
+    old_ratings = np.asarray(old_ratings, dtype=float)
+    ranks = np.asarray(ranks, dtype=float)
+    grid, table = expected_seed_table(old_ratings)
+
+    # The table counts each player against themselves too: 0.5 at their own
+    # rating, win_probability(r - old) at rating r
+    seeds = np.interp(old_ratings, grid, table) - 0.5
+    targets = np.sqrt(seeds * ranks)
+    # Solve table(perf) - win_probability(perf - old) = target; the self term
+    # barely moves with perf, so a few fixed-point steps converge.
+    # table decreases with rating, np.interp wants increasing x
+    performance = old_ratings
+    for _ in range(SELF_TERM_ITERATIONS):
+        performance = np.interp(
+            targets + win_probability(performance - old_ratings), table[::-1], grid[::-1]
+        )
+    return old_ratings + (performance - old_ratings) * contest_weight(attended)
+
+
+def predict_pairwise(old_ratings, ranks, attended, iterations=40):
+    """Exact O(n^2) reference of predict, for small contests and verification"""
+    old_ratings = np.asarray(old_ratings, dtype=float)
+    ranks = np.asarray(ranks, dtype=float)
+    diffs = old_ratings[:, None] - old_ratings[None, :]
+    seeds = 1.0 + win_probability(diffs).sum(axis=1) - 0.5
+    targets = np.sqrt(seeds * ranks)
+
+    low = np.full_like(old_ratings, old_ratings.min() - GRID_PADDING)
+    high = np.full_like(old_ratings, old_ratings.max() + GRID_PADDING)
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        # Expected rank at rating mid against everyone else
+        expected = 1.0 + win_probability(mid[:, None] - old_ratings[None, :]).sum(axis=1) \
+            - win_probability(mid - old_ratings)
+        too_low = expected > targets
+        low = np.where(too_low, mid, low)
+        high = np.where(too_low, high, mid)
+    performance = (low + high) / 2
+    return old_ratings + (performance - old_ratings) * contest_weight(attended)
+
+
+def standings_arrays(standings):
+    """(usernames, old ratings, ranks, attended contest counts) from contest records"""
+    usernames = [record["username"] for record in standings]
+    old_ratings = np.array(
+        [record.get("old_rating") or DEFAULT_RATING for record in standings], dtype=float
+    )
+    ranks = np.array([record["rank"] for record in standings], dtype=float)
+    attended = np.array(
+        [record.get("attended_contests_count", record.get("attendedContestsCount", 0)) or 0
+         for record in standings],
+        dtype=float,
+    )
+    return usernames, old_ratings, ranks, attended
+
+
+def predict_standings(standings):
+    """Contest records in, [{username, rank, old_rating, new_rating, delta_rating}] out"""
+    usernames, old_ratings, ranks, attended = standings_arrays(standings)
+    new_ratings = predict(old_ratings, ranks, attended)
+    return [
+        {
+            "username": username,
+            "rank": int(rank),
+            "old_rating": float(old),
+            "new_rating": float(new),
+            "delta_rating": float(new - old),
+        }
+        for username, rank, old, new in zip(usernames, ranks, old_ratings, new_ratings)
+    ]
+
+
+def write_rating_deltas(filename, predictions, usernames):
+    """predicted_rating_delta.json: [{name, elo: rounded delta}] for roster members who took part"""
+    roster = {username.lower(): username for username in usernames}
+    deltas = [
+        {"name": roster[prediction["username"].lower()], "elo": round(prediction["delta_rating"])}
+        for prediction in predictions
+        if prediction["username"].lower() in roster
+    ]
+    with open(filename, "w") as file:
+        json.dump(deltas, file, indent=4)
+    return deltas
+
+
+def fetch_reference(contest_name, filename=REFERENCE_CONTEST_FILE, slice_size=REFERENCE_SLICE):
+    """
+    Store a finished contest for verify: the archived (final) records of
+    every participant, reduced to the columns predict needs, and LeetCode's
+    published new ratings for slice_size participants spread over the ranks.
+    """
+    count = get_contest_record_count(contest_name, archived=True)
+    if not count:
+        print(f"No archived records for {contest_name}, ratings aren't final yet")
+        return False
+    first_page = get_contest_records_page(contest_name, 0, archived=True)
+    page_size = max(1, len(first_page))
+    skips = list(range(page_size, count, page_size))
+    pages, stats = fetch_all(
+        skips,
+        lambda skip: get_contest_records_page(contest_name, skip, page_size, archived=True),
+        PREDICTION_CONCURRENCY,
+    )
+    print_run_stats(stats, "Reference contest fetch")
+    if stats["failed"]:
+        print(f"{stats['failed']} pages failed, not writing a partial field")
+        return False
+
+    records = sorted(
+        (record for page in [first_page] + pages for record in page),
+        key=lambda record: record["rank"],
+    )
+    usernames, old_ratings, ranks, attended = standings_arrays(records)
+    step = max(1, len(records) // slice_size)
+    published = [
+        {
+            "index": index,
+            "username": record["username"],
+            "rank": record["rank"],
+            "old_rating": record.get("old_rating"),
+            "new_rating": record["new_rating"],
+        }
+        for index, record in list(enumerate(records))[::step][:slice_size]
+        if record.get("new_rating") is not None
+    ]
+    reference = {
+        "contest": contest_name,
+        "source": f"{CONTEST_RECORDS_URL} archived records, fetched {date.today().isoformat()}",
+        "tolerance": REFERENCE_TOLERANCE,
+        "field": {
+            "ranks": ranks.astype(int).tolist(),
+            "old_ratings": np.round(old_ratings, 4).tolist(),
+            "attended": attended.astype(int).tolist(),
+        },
+        "published": published,
+    }
+    with open(filename, "w") as file:
+        json.dump(reference, file, separators=(",", ":"))
+    print(f"Stored {len(records)} participants of {contest_name}, {len(published)} published ratings, in {filename}")
+    return True
+
+
+def verify(filename):
+    """Check predict against the new ratings LeetCode published for a real contest"""
+    with open(filename, "r") as file:
+        reference = json.load(file)
+    field = reference["field"]
+    old_ratings = np.array(field["old_ratings"], dtype=float)
+    ranks = np.array(field["ranks"], dtype=float)
+    predicted = predict(old_ratings, ranks, np.array(field["attended"], dtype=float))
+
+    # The whole field sets everyone's expected rank; only the slice is compared
+    error = np.array([
+        abs(predicted[record["index"]] - record["new_rating"]) for record in reference["published"]
+    ])
+    tolerance = reference.get("tolerance", REFERENCE_TOLERANCE)
+    print(
+        f"{reference['contest']}: {len(ranks)} participants, {len(error)} published ratings, "
+        f"max error {error.max():.3f}, mean error {error.mean():.3f} (tolerance {tolerance})"
+    )
+    return error.max() <= tolerance
+
+
+def verify_pairwise(filename=SAMPLE_CONTEST_FILE, tolerance=1.0):
+    """Secondary check: the vectorized path against the exact O(n^2) reference on the synthetic sample"""
+    with open(filename, "r") as file:
+        sample = json.load(file)
+    usernames, old_ratings, ranks, attended = standings_arrays(sample["standings"])
+    expected = np.array([record["new_rating"] for record in sample["standings"]])
+    error = np.abs(predict(old_ratings, ranks, attended) - expected)
+    print(f"{len(usernames)} participants vs predict_pairwise, max error {error.max():.3f}, mean error {error.mean():.3f}")
+    return error.max() <= tolerance
+
+
+def benchmark(participants=30000):
+    rng = np.random.default_rng(0)
+    old_ratings = np.clip(rng.normal(1600, 350, participants), 800, 3800)
+    ranks = np.argsort(np.argsort(-(old_ratings + rng.normal(0, 300, participants)))) + 1
+    attended = rng.integers(0, 100, participants)
+    start = time.perf_counter()
+    predict(old_ratings, ranks, attended)
+    print(f"{participants} participants predicted in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    usage = (
+        "Usage: python rating_predictor.py predict <standings.json> [--apply]\n"
+        "       python rating_predictor.py fetch-reference <contest_name>\n"
+        "       python rating_predictor.py verify <reference.json>\n"
+        "       python rating_predictor.py verify-pairwise [sample.json]\n"
+        "       python rating_predictor.py bench [participants]"
+    )
+    if len(sys.argv) < 2:
+        print(usage)
+    elif sys.argv[1] == "predict" and len(sys.argv) > 2:
+        with open(sys.argv[2], "r") as file:
+            predictions = predict_standings(json.load(file))
+        existing_elos = load_existing_elos(USERS_FILE)
+        usernames = [user["name"] for user in existing_elos]
+        deltas = write_rating_deltas(DELTA_FILE, predictions, usernames)
+        print(f"Wrote {len(deltas)} predicted deltas to {DELTA_FILE}")
+        if "--apply" in sys.argv:
+            user_ratings = join_records(predictions, usernames)
+            write_elos_to_json(USERS_FILE, update_elos_with_new_ratings(existing_elos, user_ratings))
+            print(f"Applied {len(user_ratings)} new ratings to {USERS_FILE}")
+    elif sys.argv[1] == "fetch-reference" and len(sys.argv) > 2:
+        sys.exit(0 if fetch_reference(sys.argv[2]) else 1)
+    elif sys.argv[1] == "verify" and len(sys.argv) > 2 or sys.argv[1] == "verify-pairwise":
+        ok = (verify if sys.argv[1] == "verify" else verify_pairwise)(*sys.argv[2:3])
+        print("OK" if ok else "FAILED")
+        sys.exit(0 if ok else 1)
+    elif sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 30000)
+    else:
+        print(usage)
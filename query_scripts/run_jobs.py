@@ -0,0 +1,201 @@
+import sys
+import time
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from kv_client import get_users_list
+import get_leetcode_users_elo_problems_solved as leetcode
+import get_github_contributions as github
+import query_predicted_elo as predicted
+from fetch_problem_categories import crawl
+from problem_ingest import ingest
+
+PREDICTED_USERS_FILE = "../leetcode-elo/public/users_by_elo.json"
+
+
+class Job:
+    """A named step of the run and the jobs whose results it needs"""
+
+    def __init__(self, name, run, deps=(), optional=False):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        # Optional jobs only run when asked for with --only
+        self.optional = optional
+
+
+def build_jobs(schedule, contest=None):
+    """
+    The job DAG. Every job gets the results of the jobs it depends on as a dict
+    and returns its own result. Fetch jobs don't publish; publish does it once
+    for all of them at the end.
+    """
+
+    def roster(results):
+        registered_users = get_users_list()
+        print(f"Found {len(registered_users)} registered users")
+        return registered_users
+
+    def leetcode_job(results):
+        existing_users = leetcode.prepare_users(results["roster"])
+        update = leetcode.weekly_update if schedule == "weekly" else leetcode.daily_update
+        # Contest ratings come from the same batched requests as the problem counts
+        return update(existing_users, with_elo=True, publish=False)
+
+    def github_job(results):
+        existing_users = github.prepare_users(results["roster"])
+        if schedule == "weekly":
+            return github.weekly_update(existing_users, publish=False)
+        return github.daily_update(existing_users, publish=False)
+
+    def predicted_job(results):
+        existing_elos = predicted.load_existing_elos(PREDICTED_USERS_FILE)
+        usernames = [user["name"] for user in existing_elos]
+        return existing_elos, predicted.fetch_ratings_bulk(usernames, contest)
+
+    def ingest_job(results):
+        ingest()
+
+    def categories_job(results):
+        # ingest has added new TSV problems to the crawler's input; once their
+        # topics are fetched, ingest again so both categories files include them
+        crawl()
+        ingest()
+
+    def publish(results):
+        for name in ("leetcode", "github"):
+            if results.get(name):
+                print(f"Publishing {name}...")
+                publish_fn = leetcode.publish_run if name == "leetcode" else github.publish_run
+                publish_fn(*results[name])
+        if results.get("predicted"):
+            existing_elos, user_ratings = results["predicted"]
+            print(f"Publishing {len(user_ratings)} predicted ratings...")
+            predicted.write_elos_to_json(
+                PREDICTED_USERS_FILE,
+                predicted.update_elos_with_new_ratings(existing_elos, user_ratings),
+            )
+
+    jobs = [
+        Job("roster", roster),
+        Job("leetcode", leetcode_job, ["roster"]),
+        Job("github", github_job, ["roster"]),
+        # Problem topics change rarely, daily runs only refresh them when asked to
+        Job("ingest", ingest_job, optional=schedule != "weekly"),
+        Job("categories", categories_job, ["ingest"], optional=schedule != "weekly"),
+    ]
+    if contest:
+        jobs.append(Job("predicted", predicted_job))
+    # publish waits for every other job that is part of the run
+    jobs.append(Job("publish", publish, [job.name for job in jobs if job.name != "roster"]))
+    return {job.name: job for job in jobs}
+
+
+def select_jobs(jobs, only=(), skip=()):
+    """
+    Names of the jobs to run: --only picks jobs (plus what they depend on and
+    publish), --skip drops jobs and anything that depends on them.
+    """
+    unknown = (set(only) | set(skip)) - set(jobs)
+    if unknown:
+        raise KeyError(", ".join(sorted(unknown)))
+
+    if only:
+        selected = set()
+        pending = list(only) + ["publish"]
+        while pending:
+            name = pending.pop()
+            if name not in selected and name not in skip:
+                selected.add(name)
+                pending.extend(jobs[name].deps if name != "publish" else ())
+    else:
+        selected = {name for name, job in jobs.items() if not job.optional}
+
+    changed = True
+    while changed:
+        changed = False
+        for name in list(selected):
+            deps = [dep for dep in jobs[name].deps if dep not in selected and name != "publish"]
+            if name in skip or deps:
+                selected.discard(name)
+                changed = True
+    return selected
+
+
+def run_jobs(jobs, selected, max_workers=None):
+    """
+    Run the selected jobs in dependency order, each as soon as its dependencies
+    are done, with independent jobs in parallel. A failed job's dependents are
+    skipped, except publish, which publishes whatever succeeded.
+    Returns {name: (status, seconds)}.
+    """
+    results = {}
+    timings = {}
+    remaining = set(selected)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(selected) or 1) as executor:
+        while remaining or running:
+            for name in sorted(remaining):
+                deps = [dep for dep in jobs[name].deps if dep in selected]
+                if any(dep not in timings for dep in deps):
+                    continue
+                failed = [dep for dep in deps if timings[dep][0] != "ok"]
+                remaining.discard(name)
+                if failed and name != "publish":
+                    print(f"Skipping {name}: {', '.join(failed)} did not finish")
+                    timings[name] = ("skipped", 0.0)
+                    continue
+                print(f"Starting {name}...")
+                running[executor.submit(jobs[name].run, dict(results))] = (name, time.perf_counter())
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, started = running.pop(future)
+                elapsed = time.perf_counter() - started
+                try:
+                    results[name] = future.result()
+                    timings[name] = ("ok", elapsed)
+                except Exception:
+                    traceback.print_exc()
+                    timings[name] = ("failed", elapsed)
+                print(f"Finished {name} ({timings[name][0]}) in {elapsed:.1f}s")
+    return timings
+
+
+def print_timings(timings, wall_time):
+    print("\nJob          status    seconds")
+    for name, (status, elapsed) in timings.items():
+        print(f"{name:12} {status:8} {elapsed:8.1f}")
+    total = sum(elapsed for _, elapsed in timings.values())
+    print(f"Wall time {wall_time:.1f}s, {total:.1f}s of job time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the update jobs with a single publish at the end")
+    parser.add_argument("schedule", choices=["daily", "weekly"])
+    parser.add_argument("--only", default="", help="comma separated jobs to run")
+    parser.add_argument("--skip", default="", help="comma separated jobs to leave out")
+    parser.add_argument("--contest", help="also fetch predicted ratings of this contest")
+    args = parser.parse_args(argv)
+
+    split = lambda value: [name.strip() for name in value.split(",") if name.strip()]
+    jobs = build_jobs(args.schedule, args.contest)
+    try:
+        selected = select_jobs(jobs, split(args.only), split(args.skip))
+    except KeyError as e:
+        print(f"Unknown job {e}, jobs: {', '.join(jobs)}")
+        return 1
+
+    print(f"Running {', '.join(name for name in jobs if name in selected)}")
+    start = time.perf_counter()
+    timings = run_jobs(jobs, selected)
+    print_timings(timings, time.perf_counter() - start)
+    return 0 if all(status == "ok" for status, _ in timings.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
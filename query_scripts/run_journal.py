@@ -0,0 +1,113 @@
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime
+
+RUN_JOURNAL_DIR = os.getenv(
+    "RUN_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".journal"),
+)
+
+
+def current_window(period):
+    """Run window a journal belongs to: the date for daily runs, the ISO week for weekly ones"""
+    now = datetime.now()
+    if period == "weekly":
+        year, week, _ = now.isocalendar()
+        return f"{year}-W{week:02d}"
+    return now.strftime("%Y-%m-%d")
+
+
+class RunJournal:
+    """
+    Append-only NDJSON log of per-user fetch results for one job and run window.
+    Each result is flushed to disk as soon as it is recorded, so a crashed run
+    can be restarted and skip every user already in the journal.
+
+    Once every update has been applied the run saves its final output here too.
+    A restart that finds an output publishes it as-is instead of applying the
+    (not idempotent) weekly updates to already published records a second time.
+    """
+
+    def __init__(self, job, period="daily"):
+        self.path = os.path.join(RUN_JOURNAL_DIR, f"{job}-{current_window(period)}.ndjson")
+        self.lock = threading.Lock()
+        self.output = None
+        self.results = self._load()
+        if self.output is not None:
+            print(f"Resuming {job}: final output already computed ({self.path})")
+        elif self.results:
+            print(f"Resuming {job}: {len(self.results)} users already done ({self.path})")
+
+    def _load(self):
+        results = {}
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn last line from a crash mid-write
+                        continue
+                    if "output" in entry:
+                        self.output = entry["output"]
+                    else:
+                        results[entry["user"]] = entry["result"]
+        except FileNotFoundError:
+            pass
+        return results
+
+    def __contains__(self, user):
+        return user in self.results
+
+    def get(self, user, default=None):
+        return self.results.get(user, default)
+
+    def record(self, user, result):
+        self.record_many({user: result})
+
+    def record_many(self, results):
+        """Durably append {user: result} entries"""
+        self._append(
+            [{"user": user, "result": result} for user, result in results.items()]
+        )
+        with self.lock:
+            self.results.update(results)
+
+    def save_output(self, output):
+        """Durably store the run's final output before it is published"""
+        self._append([{"output": output}])
+        self.output = output
+
+    def _append(self, entries):
+        lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+        with self.lock:
+            os.makedirs(RUN_JOURNAL_DIR, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def complete(self):
+        """Drop the journal once the run's final write has succeeded"""
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def atomic_write_json(filename, data, indent=4):
+    """Write JSON to a temp file next to filename and rename it over the original"""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
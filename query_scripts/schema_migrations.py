@@ -0,0 +1,185 @@
+import sys
+import copy
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+from json_stream import iter_users, write_users
+
+# Every stored record carries a schema_version. Migrations are registered per
+# board in order (version 1, 2, ...) and each one takes a record one version
+# up. Records are upgraded one at a time, either in bulk with this script
+# (a .json/.ndjson file or KV) or lazily as they are read, so old data keeps
+# working until someone gets around to migrating it. New records are created
+# at the current version; one without schema_version predates versioning and
+# counts as version 0.
+SCHEMA_VERSION_FIELD = "schema_version"
+
+KEY_FIELDS = {"leetcode": "name", "github": "github_username"}
+MIGRATIONS = {board: [] for board in KEY_FIELDS}
+
+# Shown per run by --dry-run
+MAX_DIFFS_SHOWN = 20
+
+
+def migration(board, version):
+    """Register fn(record) -> record as the step from version - 1 to version"""
+    def register(fn):
+        steps = MIGRATIONS[board]
+        if version != len(steps) + 1:
+            raise ValueError(f"{board} migration {fn.__name__} is version {version}, expected {len(steps) + 1}")
+        steps.append(fn)
+        return fn
+    return register
+
+
+def current_version(board):
+    return len(MIGRATIONS[board])
+
+
+def record_version(record):
+    return record.get(SCHEMA_VERSION_FIELD, 0)
+
+
+def upgrade(board, record):
+    """Bring one record up to the current schema in place and return it"""
+    steps = MIGRATIONS[board]
+    for version in range(record_version(record) + 1, len(steps) + 1):
+        record = steps[version - 1](record)
+        record[SCHEMA_VERSION_FIELD] = version
+    return record
+
+
+def upgrade_records(board, records):
+    """Lazily upgrade records as they are read; a no-op for records that are current"""
+    latest = current_version(board)
+    for record in records:
+        yield upgrade(board, record) if record_version(record) < latest else record
+
+
+# --- leetcode ---
+
+HISTORY_END_DATE = datetime(2025, 7, 22)
+
+
+def estimate_dates_for_user(problems_array):
+    """Estimate dates working backwards from July 22, 2025 at 7-day intervals."""
+    last = len(problems_array) - 1
+    return [
+        {
+            "date": (HISTORY_END_DATE - timedelta(days=(last - i) * 7)).strftime("%Y-%m-%d"),
+            "count": count,
+        }
+        for i, count in enumerate(problems_array)
+    ]
+
+
+@migration("leetcode", 1)
+def date_weekly_history(user):
+    """problems_each_week from bare counts to {date, count} points"""
+    weeks = user.get("problems_each_week") or []
+    if weeks and isinstance(weeks[0], int):
+        user["problems_each_week"] = estimate_dates_for_user(weeks)
+    return user
+
+
+@migration("leetcode", 2)
+def drop_last_polled(user):
+    """The poll scheduler keeps last_polled in leetcode:poll_state, out of the published record"""
+    user.pop("last_polled", None)
+    return user
+
+
+# --- applying migrations in bulk ---
+
+def record_diff(old, new):
+    """Lines describing the fields that differ between two versions of a record"""
+    lines = []
+    for field in sorted(set(old) | set(new)):
+        if field not in new:
+            lines.append(f"  - {field}")
+        elif field not in old:
+            lines.append(f"  + {field}: {_short(new[field])}")
+        elif old[field] != new[field]:
+            lines.append(f"  ~ {field}: {_short(old[field])} -> {_short(new[field])}")
+    return lines
+
+
+def _short(value, limit=80):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def migrate_records(board, records, report, show_diffs=False):
+    """
+    Upgrade a stream of records, counting them by the version they started at
+    in report. With show_diffs the changes of the first MAX_DIFFS_SHOWN
+    upgraded records are printed.
+    """
+    latest = current_version(board)
+    for record in records:
+        version = record_version(record)
+        report[f"from v{version}"] += 1
+        if version > latest:
+            print(f"{record.get(KEY_FIELDS[board])} is at v{version}, newer than this code's v{latest}, left as is")
+        elif version < latest:
+            before = copy.deepcopy(record) if show_diffs else None
+            record = upgrade(board, record)
+            report["upgraded"] += 1
+            if before is not None and report["upgraded"] <= MAX_DIFFS_SHOWN:
+                print(f"{record.get(KEY_FIELDS[board])}:")
+                print("\n".join(record_diff(before, record)) or "  (only the version changes)")
+        yield record
+
+
+def migrate_file(board, filename, dry_run=False):
+    """Upgrade every record of a .json/.ndjson user file, replacing it in one step unless dry_run"""
+    report = Counter()
+    records = migrate_records(board, iter_users(filename), report, show_diffs=dry_run)
+    if dry_run:
+        for _ in records:
+            pass
+    else:
+        # write_users only replaces the file once every record is written
+        write_users(filename, records)
+    print_report(board, filename, report, dry_run)
+    return report
+
+
+def migrate_kv(board, dry_run=False):
+    """Upgrade the records of a board in KV; only the shards that changed are written"""
+    from kv_client import get_leetcode_data, put_leetcode_data, get_github_data, put_github_data
+
+    get_data, put_data = {
+        "leetcode": (get_leetcode_data, put_leetcode_data),
+        "github": (get_github_data, put_github_data),
+    }[board]
+    report = Counter()
+    records = list(migrate_records(board, get_data(upgrade=False), report, show_diffs=dry_run))
+    if not dry_run and report["upgraded"] and not put_data(records):
+        print(f"Failed to write {board} to KV, re-run to retry")
+        report["failed"] = 1
+    print_report(board, f"{board} in KV", report, dry_run)
+    return report
+
+
+def print_report(board, target, report, dry_run):
+    versions = ", ".join(f"{count} {name}" for name, count in sorted(report.items()) if name.startswith("from v"))
+    action = "would upgrade" if dry_run else "upgraded"
+    print(f"{target}: {action} {report['upgraded']} records to {board} v{current_version(board)} ({versions or 'no records'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade stored leaderboard records to the current schema")
+    parser.add_argument("board", choices=sorted(MIGRATIONS))
+    parser.add_argument("file", nargs="?", help=".json or .ndjson user file to migrate in place")
+    parser.add_argument("--kv", action="store_true", help="migrate the board's records in KV")
+    parser.add_argument("--dry-run", action="store_true", help="show what would change without writing")
+    args = parser.parse_args()
+
+    if args.kv == bool(args.file):
+        parser.error("pass either a file or --kv")
+    if args.kv:
+        report = migrate_kv(args.board, args.dry_run)
+    else:
+        report = migrate_file(args.board, args.file, args.dry_run)
+    sys.exit(1 if report["failed"] else 0)
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import sqlite3
+from datetime import datetime
+from schema_migrations import estimate_dates_for_user
+
+# Local history of weekly counts, one row per (series, user, date). Series are
+# "problems" (problems_each_week) and "contributions" (contributions_each_week).
+# The history lists in KV stay the source of truth: this store lives on one
+# machine and may be behind KV (another host ran the job, a restored or stale
+# DB). The weekly runs only write to it, one transaction per run, and keep
+# publishing the lists of the records themselves; it is there for range
+# queries and exports without pulling every record out of KV.
+TIMESERIES_DB = os.getenv(
+    "TIMESERIES_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeseries.db"),
+)
+
+# Which record field holds each series in the JSON the frontend reads
+SERIES_FIELDS = {
+    "problems": ("name", "problems_each_week"),
+    "contributions": ("github_username", "contributions_each_week"),
+}
+
+
+class TimeSeriesStore:
+    """SQLite-backed append-only store for per-user weekly counts"""
+
+    def __init__(self, path=TIMESERIES_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS points (
+                series TEXT NOT NULL,
+                user TEXT NOT NULL,
+                date TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (series, user, date)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, series, user, date, count):
+        """Record one point; a second point for the same date replaces the first"""
+        self.append_many(series, [(user, date, count)])
+
+    def append_many(self, series, points):
+        """Record (user, date, count) points in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO points (series, user, date, count) VALUES (?, ?, ?, ?)",
+                ((series, user, date, count) for user, date, count in points),
+            )
+
+    def history(self, series, user, start=None, end=None):
+        """Points of one user as [{"date", "count"}], optionally limited to start <= date <= end"""
+        rows = self.conn.execute(
+            """
+            SELECT date, count FROM points
+            WHERE series = ? AND user = ? AND date >= ? AND date <= ?
+            ORDER BY date
+            """,
+            (series, user, start or "", end or "9999-12-31"),
+        )
+        return [{"date": date, "count": count} for date, count in rows]
+
+    def users(self, series):
+        """Users that have at least one point in a series"""
+        rows = self.conn.execute("SELECT DISTINCT user FROM points WHERE series = ?", (series,))
+        return {user for (user,) in rows}
+
+    def export(self, series):
+        """Whole series as {user: [{"date", "count"}]}"""
+        histories = {}
+        rows = self.conn.execute(
+            "SELECT user, date, count FROM points WHERE series = ? ORDER BY user, date",
+            (series,),
+        )
+        for user, date, count in rows:
+            histories.setdefault(user, []).append({"date": date, "count": count})
+        return histories
+
+    def backfill(self, series, records, only_missing=True):
+        """
+        Load the history lists of existing records into the store. Undated
+        integer lists (pre-migration format) get estimated dates like
+        leetcode schema v1. With only_missing, users that already
+        have points are skipped. Returns the number of users loaded.
+        """
+        user_field, list_field = SERIES_FIELDS[series]
+        known = self.users(series) if only_missing else set()
+        points = []
+        loaded = 0
+        for record in records:
+            user = record[user_field]
+            entries = record.get(list_field) or []
+            if user in known or not entries:
+                continue
+            if isinstance(entries[0], int):
+                entries = estimate_dates_for_user(entries)
+            points.extend((user, entry["date"], entry["count"]) for entry in entries)
+            loaded += 1
+        self.append_many(series, points)
+        return loaded
+
+    def attach(self, series, records):
+        """Set each record's history list from the store, the shape the frontend reads"""
+        user_field, list_field = SERIES_FIELDS[series]
+        histories = self.export(series)
+        for record in records:
+            record[list_field] = histories.get(record[user_field], [])
+        return records
+
+
+def merge_histories(*histories):
+    """Union of [{"date", "count"}] lists by date; on the same date the later list wins"""
+    points = {}
+    for history in histories:
+        for entry in history:
+            points[entry["date"]] = entry["count"]
+    return [{"date": date, "count": count} for date, count in sorted(points.items())]
+
+
+def add_weekly_point(series, record, count, date):
+    """
+    Add a point to a record's own history list, replacing one for the same
+    date, and return it as a (user, date, count) point for append_many.
+    """
+    user_field, list_field = SERIES_FIELDS[series]
+    entries = record.get(list_field) or []
+    if entries and isinstance(entries[0], int):
+        entries = estimate_dates_for_user(entries)
+    record[list_field] = merge_histories(entries, [{"date": date, "count": count}])
+    return record[user_field], date, count
+
+
+def log_weekly_points(series, records, points):
+    """
+    Write a weekly run's points to the local store in one transaction. Users
+    the store has never seen get their history from the records loaded first.
+    """
+    with TimeSeriesStore() as store:
+        store.backfill(series, records)
+        store.append_many(series, points)
+
+
+if __name__ == "__main__":
+    usage = (
+        "Usage: python timeseries_store.py backfill <problems|contributions> <json_file>\n"
+        "       python timeseries_store.py export <problems|contributions> <json_file>\n"
+        "       python timeseries_store.py query <problems|contributions> <user> [start] [end]"
+    )
+    if len(sys.argv) < 4 or sys.argv[2] not in SERIES_FIELDS:
+        print(usage)
+        sys.exit(1)
+
+    command, series = sys.argv[1], sys.argv[2]
+    with TimeSeriesStore() as store:
+        if command == "backfill":
+            with open(sys.argv[3], "r") as f:
+                loaded = store.backfill(series, json.load(f))
+            print(f"Loaded {series} history of {loaded} users")
+        elif command == "export":
+            with open(sys.argv[3], "w") as f:
+                json.dump(store.export(series), f, indent=4)
+            print(f"Exported {series} history to {sys.argv[3]}")
+        elif command == "query":
+            start = sys.argv[4] if len(sys.argv) > 4 else None
+            end = sys.argv[5] if len(sys.argv) > 5 else None
+            print(json.dumps(store.history(series, sys.argv[3], start, end), indent=4))
+        else:
+            print(usage)
@@ -0,0 +1,213 @@
+import re
+import sys
+import json
+import time
+import struct
+import unicodedata
+from array import array
+from collections import Counter
+from itertools import chain
+
+SOURCE_FILES = [
+    "leetcode-problem-analysis/leetcode_problems_with_categories.json",
+    "../leetcode-elo/public/ratings.json",
+]
+INDEX_FILE = "leetcode-problem-analysis/title_search.idx"
+
+MAGIC = b"LCTS1\n"
+
+# CJK titles have no spaces and short queries ("两数之和", "子数组") are common,
+# so CJK runs are indexed as unigrams and bigrams; everything else as
+# space-padded word trigrams.
+CJK_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+WORD_RE = re.compile(r"[0-9a-z]+")
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def grams(text):
+    """Set of search grams of a title, slug or query"""
+    text = normalize(text)
+    result = set()
+    for run in CJK_RE.findall(text):
+        result.update(run)
+        result.update(run[i:i + 2] for i in range(len(run) - 1))
+    for word in WORD_RE.findall(text):
+        padded = f" {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def problem_fields(record):
+    """(ID, Title, TitleZH, TitleSlug, Rating) from either spelling of the source keys"""
+    return (
+        int(record["ID"]),
+        record.get("Title", ""),
+        record.get("TitleZH", record.get("Title ZH", "")),
+        record.get("TitleSlug", record.get("Title Slug", "")),
+        float(record.get("Rating", 0)),
+    )
+
+
+class TitleIndex:
+    """Inverted n-gram index over problem titles (EN and ZH) and slugs"""
+
+    def __init__(self, docs, postings):
+        # docs: list of (ID, Title, TitleZH, TitleSlug, Rating); postings: {gram: array('I') of doc numbers}
+        self.docs = docs
+        self.postings = postings
+        # Lowercased "title|title_zh|slug" per doc for the substring bonus
+        self.haystacks = [
+            f"{normalize(title)}|{title_zh}|{slug}" for _, title, title_zh, slug, _ in docs
+        ]
+
+    @classmethod
+    def build(cls, records):
+        docs = {}
+        for record in records:
+            fields = problem_fields(record)
+            docs.setdefault(fields[0], fields)
+        docs = sorted(docs.values())
+
+        postings = {}
+        for doc, (_, title, title_zh, slug, _) in enumerate(docs):
+            for gram in grams(title) | grams(title_zh) | grams(slug.replace("-", " ")):
+                postings.setdefault(gram, array("I")).append(doc)
+        return cls(docs, postings)
+
+    def search(self, query, limit=10):
+        """
+        Ranked matches as [(score, record)]. Score is the share of query grams a
+        title contains, plus a bonus when the whole query is a substring. Only
+        the best candidates by gram count are considered for the bonus.
+        """
+        query_grams = grams(query)
+        if not query_grams:
+            return []
+
+        hits = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in query_grams))
+
+        needle = normalize(query).strip()
+        scored = []
+        for doc, count in hits.most_common(limit * 5):
+            score = count / len(query_grams)
+            if needle in self.haystacks[doc]:
+                score += 1
+            scored.append((score, doc))
+        scored.sort(key=lambda item: (-item[0], -self.docs[item[1]][4]))
+        return [(score, self.record(doc)) for score, doc in scored[:limit]]
+
+    def record(self, doc):
+        problem_id, title, title_zh, slug, rating = self.docs[doc]
+        return {"ID": problem_id, "Title": title, "TitleZH": title_zh, "TitleSlug": slug, "Rating": rating}
+
+    def save(self, filename=INDEX_FILE):
+        """
+        Binary layout: MAGIC, uint32 header length, JSON header (docs, grams,
+        posting lengths), then every posting list as little-endian uint32s.
+        """
+        grams_sorted = sorted(self.postings)
+        header = json.dumps(
+            {"docs": self.docs, "grams": grams_sorted,
+             "lengths": [len(self.postings[gram]) for gram in grams_sorted]},
+            ensure_ascii=False, separators=(",", ":"),
+        ).encode("utf-8")
+        body = array("I")
+        for gram in grams_sorted:
+            body.extend(self.postings[gram])
+        if sys.byteorder == "big":
+            body.byteswap()
+        with open(filename, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(body.tobytes())
+
+    @classmethod
+    def load(cls, filename=INDEX_FILE):
+        with open(filename, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{filename} is not a title search index")
+        offset = len(MAGIC)
+        (header_length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        header = json.loads(data[offset:offset + header_length].decode("utf-8"))
+        body = array("I")
+        body.frombytes(data[offset + header_length:])
+        if sys.byteorder == "big":
+            body.byteswap()
+
+        postings = {}
+        start = 0
+        for gram, length in zip(header["grams"], header["lengths"]):
+            postings[gram] = body[start:start + length]
+            start += length
+        return cls([tuple(doc) for doc in header["docs"]], postings)
+
+
+def load_records(filenames=SOURCE_FILES):
+    records = []
+    for filename in filenames:
+        with open(filename, "r") as f:
+            records.extend(json.load(f))
+    return records
+
+
+def naive_search(records, query, limit=10):
+    """What searching looks like without the index: a substring scan of every record"""
+    needle = normalize(query).strip()
+    matches = [
+        record for record in records
+        if needle in normalize(record.get("Title", ""))
+        or needle in record.get("TitleZH", record.get("Title ZH", ""))
+        or needle in record.get("TitleSlug", record.get("Title Slug", ""))
+    ]
+    return matches[:limit]
+
+
+def benchmark(queries, repeat=200):
+    records = load_records()
+    start = time.perf_counter()
+    index = TitleIndex.build(records)
+    build_time = time.perf_counter() - start
+    index.save()
+    start = time.perf_counter()
+    index = TitleIndex.load()
+    load_time = time.perf_counter() - start
+
+    print(f"{len(index.docs)} problems, {len(index.postings)} grams")
+    print(f"Build: {build_time * 1000:.1f} ms, load from {INDEX_FILE}: {load_time * 1000:.1f} ms")
+    for query in queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            index.search(query)
+        indexed = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            naive_search(records, query)
+        naive = (time.perf_counter() - start) / repeat
+        print(f"{query!r:24} index {indexed * 1e6:8.1f} us   scan {naive * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    usage = (
+        "Usage: python title_search.py build\n"
+        "       python title_search.py search <query>\n"
+        "       python title_search.py bench [query ...]"
+    )
+    if len(sys.argv) < 2:
+        print(usage)
+    elif sys.argv[1] == "build":
+        index = TitleIndex.build(load_records())
+        index.save()
+        print(f"Indexed {len(index.docs)} problems into {INDEX_FILE}")
+    elif sys.argv[1] == "search" and len(sys.argv) > 2:
+        for score, record in TitleIndex.load().search(" ".join(sys.argv[2:])):
+            print(f"{score:4.2f}  {record['ID']:>5}  {record['Title']}  {record['TitleZH']}")
+    elif sys.argv[1] == "bench":
+        benchmark(sys.argv[2:] or ["two sum", "subarray", "子数组", "最大", "palindrom", "minimum-cost"])
+    else:
+        print(usage)
@@ -1,4 +1,4 @@
 #!/bin/bash
 
-# Run the Python script
-python query_users_elo_daily.py
\ No newline at end of file
+# Run every update job with a single publish at the end, see run_jobs.py --help
+python run_jobs.py weekly "$@"